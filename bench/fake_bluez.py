@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# A stand-in for org.bluez on a private D-Bus bus, used to benchmark BluetoothManager without radios.
+#
+# It implements the parts of ObjectManager, Adapter1, Device1, AgentManager1 and
+# LEAdvertisingManager1 that the module uses, and simulates N known and M ambient devices with
+# scripted arrivals and departures, RSSI noise and connect latencies.  Every method call it
+# receives is counted and can be read back through the org.bluez.Sim1 interface on "/".
+#
+#   python3 bench/fake_bluez.py --address unix:path=/tmp/bus --known 50 --ambient 500
+
+import sys
+import random
+import argparse
+from collections import Counter
+
+import dbus
+import dbus.bus
+import dbus.exceptions
+import dbus.service
+import dbus.mainloop.glib
+
+try:
+    from gi.repository import GLib
+except ImportError:
+    import glib as GLib
+
+BLUEZ_SERVICE_NAME = 'org.bluez'
+DBUS_OM_IFACE = 'org.freedesktop.DBus.ObjectManager'
+DBUS_PROP_IFACE = 'org.freedesktop.DBus.Properties'
+DEVICE_IFACE = 'org.bluez.Device1'
+ADAPTER_IFACE = 'org.bluez.Adapter1'
+AGENT_IFACE = 'org.bluez.Agent1'
+AGENT_MANAGER_IFACE = 'org.bluez.AgentManager1'
+LE_ADVERTISING_MANAGER_IFACE = 'org.bluez.LEAdvertisingManager1'
+SIM_IFACE = 'org.bluez.Sim1'
+
+ADAPTER_PATH = '/org/bluez/hci0'
+ADAPTER_ADDRESS = '00:1A:7D:DA:71:13'
+
+def known_address(index):
+    return f"AA:00:00:00:{index // 256:02X}:{index % 256:02X}"
+
+def random_address():
+    # static random addresses have the two most significant bits set
+    return ":".join(f"{b:02X}" for b in [0xC0 | random.randint(0, 0x3F)] + [random.randint(0, 255) for _ in range(5)])
+
+def device_path(address):
+    return f"{ADAPTER_PATH}/dev_{address.replace(':', '_')}"
+
+class NotFound(dbus.exceptions.DBusException):
+    _dbus_error_name = 'org.bluez.Error.DoesNotExist'
+
+class Failed(dbus.exceptions.DBusException):
+    _dbus_error_name = 'org.bluez.Error.Failed'
+
+class PropertiesObject(dbus.service.Object):
+    def __init__(self, sim, path, interface, props):
+        self.sim = sim
+        self.path = path
+        self.interface = interface
+        self.props = props
+        dbus.service.Object.__init__(self, sim.bus_name, path)
+
+    def interfaces(self):
+        return {self.interface: self.props}
+
+    def update(self, **changed):
+        self.props.update(changed)
+        self.PropertiesChanged(self.interface, changed, dbus.Array([], signature='s'))
+
+    @dbus.service.method(DBUS_PROP_IFACE, in_signature='ss', out_signature='v')
+    def Get(self, interface, name):
+        self.sim.count('Properties.Get')
+        if name not in self.props:
+            raise NotFound(name)
+        return self.props[name]
+
+    @dbus.service.method(DBUS_PROP_IFACE, in_signature='s', out_signature='a{sv}')
+    def GetAll(self, interface):
+        self.sim.count('Properties.GetAll')
+        return self.props if interface == self.interface else {}
+
+    @dbus.service.method(DBUS_PROP_IFACE, in_signature='ssv', out_signature='')
+    def Set(self, interface, name, value):
+        self.sim.count('Properties.Set')
+        self.update(**{name: value})
+
+    @dbus.service.signal(DBUS_PROP_IFACE, signature='sa{sv}as')
+    def PropertiesChanged(self, interface, changed, invalidated):
+        pass
+
+class Adapter(PropertiesObject):
+    def __init__(self, sim):
+        PropertiesObject.__init__(self, sim, ADAPTER_PATH, ADAPTER_IFACE, {
+            'Address': dbus.String(ADAPTER_ADDRESS),
+            'Alias': dbus.String('fake'),
+            'Powered': dbus.Boolean(False),
+            'Discoverable': dbus.Boolean(False),
+            'DiscoverableTimeout': dbus.UInt32(180),
+            'Pairable': dbus.Boolean(False),
+            'Discovering': dbus.Boolean(False),
+        })
+
+    @dbus.service.method(ADAPTER_IFACE, in_signature='', out_signature='')
+    def StartDiscovery(self):
+        self.sim.count('Adapter1.StartDiscovery')
+        self.update(Discovering=dbus.Boolean(True))
+
+    @dbus.service.method(ADAPTER_IFACE, in_signature='', out_signature='')
+    def StopDiscovery(self):
+        self.sim.count('Adapter1.StopDiscovery')
+        self.update(Discovering=dbus.Boolean(False))
+
+    @dbus.service.method(ADAPTER_IFACE, in_signature='a{sv}', out_signature='')
+    def SetDiscoveryFilter(self, properties):
+        self.sim.count('Adapter1.SetDiscoveryFilter')
+
+    @dbus.service.method(ADAPTER_IFACE, in_signature='o', out_signature='')
+    def RemoveDevice(self, path):
+        self.sim.count('Adapter1.RemoveDevice')
+        if not self.sim.remove_device(str(path)):
+            raise NotFound(path)
+
+    @dbus.service.method(LE_ADVERTISING_MANAGER_IFACE, in_signature='oa{sv}', out_signature='')
+    def RegisterAdvertisement(self, path, options):
+        self.sim.count('LEAdvertisingManager1.RegisterAdvertisement')
+
+    @dbus.service.method(LE_ADVERTISING_MANAGER_IFACE, in_signature='o', out_signature='')
+    def UnregisterAdvertisement(self, path):
+        self.sim.count('LEAdvertisingManager1.UnregisterAdvertisement')
+
+class Device(PropertiesObject):
+    def __init__(self, sim, address, name, in_range, rssi_mean):
+        self.address = address
+        self.in_range = in_range
+        self.rssi_mean = rssi_mean
+        props = {
+            'Address': dbus.String(address),
+            'AddressType': dbus.String('random'),
+            'Name': dbus.String(name),
+            'Alias': dbus.String(name),
+            'Adapter': dbus.ObjectPath(ADAPTER_PATH),
+            'Paired': dbus.Boolean(False),
+            'Connected': dbus.Boolean(False),
+            'UUIDs': dbus.Array([], signature='s'),
+        }
+        if in_range:
+            props['RSSI'] = dbus.Int16(self.sample_rssi(sim))
+        PropertiesObject.__init__(self, sim, device_path(address), DEVICE_IFACE, props)
+
+    def sample_rssi(self, sim):
+        return int(max(-127, min(0, random.gauss(self.rssi_mean, sim.args.rssi_noise))))
+
+    @dbus.service.method(DEVICE_IFACE, in_signature='', out_signature='', async_callbacks=('reply', 'error'))
+    def Connect(self, reply, error):
+        self.sim.count('Device1.Connect')
+        if self.in_range:
+            latency = max(0.01, random.gauss(self.sim.args.connect_latency, self.sim.args.connect_latency / 4))
+            GLib.timeout_add(int(latency * 1000), self.connected, reply)
+        else:
+            # out of range devices fail only after the full page timeout, like a real controller
+            GLib.timeout_add(int(self.sim.args.connect_timeout * 1000), self.connect_failed, error)
+
+    def connected(self, reply):
+        self.update(Connected=dbus.Boolean(True))
+        reply()
+        GLib.timeout_add(int(self.sim.args.connection_hold * 1000), self.disconnect)
+        return False
+
+    def connect_failed(self, error):
+        error(Failed('Page Timeout'))
+        return False
+
+    def disconnect(self):
+        if self.props['Connected']:
+            self.update(Connected=dbus.Boolean(False))
+        return False
+
+    @dbus.service.method(DEVICE_IFACE, in_signature='', out_signature='')
+    def Disconnect(self):
+        self.sim.count('Device1.Disconnect')
+        self.disconnect()
+
+class AgentManager(dbus.service.Object):
+    def __init__(self, sim):
+        self.sim = sim
+        self.agent = None
+        dbus.service.Object.__init__(self, sim.bus_name, '/org/bluez')
+
+    @dbus.service.method(AGENT_MANAGER_IFACE, in_signature='os', out_signature='', sender_keyword='sender')
+    def RegisterAgent(self, path, capability, sender=None):
+        self.sim.count('AgentManager1.RegisterAgent')
+        self.agent = (sender, path)
+
+    @dbus.service.method(AGENT_MANAGER_IFACE, in_signature='o', out_signature='')
+    def UnregisterAgent(self, path):
+        self.sim.count('AgentManager1.UnregisterAgent')
+        self.agent = None
+
+    @dbus.service.method(AGENT_MANAGER_IFACE, in_signature='o', out_signature='')
+    def RequestDefaultAgent(self, path):
+        self.sim.count('AgentManager1.RequestDefaultAgent')
+
+class Root(dbus.service.Object):
+    def __init__(self, sim):
+        self.sim = sim
+        dbus.service.Object.__init__(self, sim.bus_name, '/')
+
+    @dbus.service.method(DBUS_OM_IFACE, in_signature='', out_signature='a{oa{sa{sv}}}')
+    def GetManagedObjects(self):
+        self.sim.count('ObjectManager.GetManagedObjects')
+        objects = {ADAPTER_PATH: self.sim.adapter.interfaces()}
+        for device in self.sim.devices.values():
+            objects[device.path] = device.interfaces()
+        return objects
+
+    @dbus.service.signal(DBUS_OM_IFACE, signature='oa{sa{sv}}')
+    def InterfacesAdded(self, path, interfaces):
+        pass
+
+    @dbus.service.signal(DBUS_OM_IFACE, signature='oas')
+    def InterfacesRemoved(self, path, interfaces):
+        pass
+
+    @dbus.service.method(SIM_IFACE, in_signature='', out_signature='a{su}')
+    def GetStats(self):
+        return dict(self.sim.calls)
+
+    @dbus.service.method(SIM_IFACE, in_signature='', out_signature='')
+    def ResetStats(self):
+        self.sim.calls.clear()
+
+    @dbus.service.method(SIM_IFACE, in_signature='s', out_signature='o')
+    def RequestPairing(self, name):
+        # a new phone shows up and asks to pair, the registered agent is asked to confirm
+        return self.sim.request_pairing(name)
+
+    @dbus.service.method(SIM_IFACE, in_signature='as', out_signature='')
+    def SetInRange(self, addresses):
+        for address in addresses:
+            self.sim.set_in_range(str(address), True)
+
+class Simulation:
+    def __init__(self, bus, args):
+        self.args = args
+        self.calls = Counter()
+        self.bus_name = dbus.service.BusName(BLUEZ_SERVICE_NAME, bus)
+        self.bus = bus
+        self.root = Root(self)
+        self.adapter = Adapter(self)
+        self.agent_manager = AgentManager(self)
+        self.devices = {}
+        self.known = [known_address(i) for i in range(args.known)]
+
+        for i, address in enumerate(self.known):
+            in_range = random.random() < args.known_present
+            self.add_device(address, f"Known phone {i}", in_range, signal=False)
+        for _ in range(args.ambient):
+            self.add_device(random_address(), "", True, signal=False)
+
+        GLib.timeout_add(int(1000 / args.rssi_rate), self.rssi_tick)
+        GLib.timeout_add(int(args.churn_interval * 1000), self.churn_tick)
+
+    def count(self, call):
+        self.calls[call] += 1
+
+    def add_device(self, address, name, in_range, signal=True):
+        device = Device(self, address, name, in_range, random.uniform(-95, -45))
+        self.devices[device.path] = device
+        if signal:
+            self.root.InterfacesAdded(device.path, device.interfaces())
+        return device
+
+    def remove_device(self, path):
+        device = self.devices.pop(path, None)
+        if device is None:
+            return False
+        device.remove_from_connection()
+        self.root.InterfacesRemoved(path, dbus.Array([DEVICE_IFACE], signature='s'))
+        return True
+
+    def set_in_range(self, address, in_range):
+        device = self.devices.get(device_path(address))
+        if device is None:
+            if not in_range:
+                return
+            device = self.add_device(address, f"Known phone {address[-5:]}", True)
+        device.in_range = in_range
+
+    def rssi_tick(self):
+        # each in-range device advertises once per rssi_rate tick on average
+        for device in list(self.devices.values()):
+            if device.in_range and random.random() < 0.5:
+                device.update(RSSI=dbus.Int16(device.sample_rssi(self)))
+        return True
+
+    def churn_tick(self):
+        # known devices wander in and out of range
+        for address in random.sample(self.known, min(len(self.known), self.args.known_churn)):
+            device = self.devices.get(device_path(address))
+            self.set_in_range(address, not (device and device.in_range))
+        # ambient devices come and go
+        ambient = [path for path, device in self.devices.items() if device.address not in self.known]
+        for path in random.sample(ambient, min(len(ambient), self.args.ambient_churn)):
+            self.remove_device(path)
+        for _ in range(self.args.ambient_churn):
+            self.add_device(random_address(), "", True)
+        return True
+
+    def request_pairing(self, name):
+        device = self.add_device(random_address(), name, True)
+        if self.agent_manager.agent is None:
+            raise Failed('No agent registered')
+        sender, path = self.agent_manager.agent
+        agent = dbus.Interface(self.bus.get_object(sender, path), AGENT_IFACE)
+        agent.RequestConfirmation(dbus.ObjectPath(device.path), dbus.UInt32(random.randint(0, 999999)),
+                                  reply_handler=lambda: None, error_handler=lambda e: None)
+        return dbus.ObjectPath(device.path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated org.bluez service for benchmarks')
+    parser.add_argument('--address', required=True, help='address of the private bus to own org.bluez on')
+    parser.add_argument('--known', type=int, default=50, help='number of known (enrolled) devices')
+    parser.add_argument('--known-present', type=float, default=0.5, help='fraction of known devices in range at start')
+    parser.add_argument('--known-churn', type=int, default=2, help='known devices toggled in/out of range per churn interval')
+    parser.add_argument('--ambient', type=int, default=500, help='number of ambient (unknown) devices')
+    parser.add_argument('--ambient-churn', type=int, default=20, help='ambient devices replaced per churn interval')
+    parser.add_argument('--churn-interval', type=float, default=5.0)
+    parser.add_argument('--rssi-rate', type=float, default=10.0, help='RSSI update rounds per second')
+    parser.add_argument('--rssi-noise', type=float, default=6.0, help='standard deviation of RSSI noise (dB)')
+    parser.add_argument('--connect-latency', type=float, default=0.3, help='mean connect latency of in-range devices (s)')
+    parser.add_argument('--connect-timeout', type=float, default=5.0, help='time until a connect to an out-of-range device fails (s)')
+    parser.add_argument('--connection-hold', type=float, default=2.0, help='how long a probe connection stays up (s)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+    bus = dbus.bus.BusConnection(args.address)
+    Simulation(bus, args)
+    print("ready", flush=True)
+    GLib.MainLoop().run()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# Repeatable benchmarks for the presence engine, run against bench/fake_bluez.py on a private bus.
+#
+# Starts a private dbus-daemon and the simulated BlueZ, enrolls the simulated known devices in a
+# temporary database, runs a BluetoothManager against them and reports:
+#   - check_for_devices tick latency
+#   - D-Bus calls per tick (as counted by the simulated BlueZ)
+#   - get_readings latency under load
+#   - SQLite writes per minute
+#   - is_known_device latency for known and unknown devices
+#   - pairing flow latency (RequestConfirmation to pairing request, and accept)
+#
+#   python3 bench/run_benchmarks.py --known 100 --ambient 1000 --duration 30
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+import dbus
+import dbus.bus
+import dbus.mainloop.glib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.bluetooth import BluetoothManager
+from src.presence_view import PresenceView
+from src.persistence import DeviceStore
+from src.registry import derive_device_id
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bluez import BLUEZ_SERVICE_NAME, SIM_IFACE, known_address
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(at(0.50) * 1000, 3),
+        "p99_ms": round(at(0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+def start_bus():
+    process = subprocess.Popen(["dbus-daemon", "--session", "--nofork", "--print-address=1"],
+                               stdout=subprocess.PIPE, text=True)
+    address = process.stdout.readline().strip()
+    return process, address
+
+def start_fake_bluez(address, args):
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_bluez.py"),
+               "--address", address, "--known", str(args.known), "--ambient", str(args.ambient),
+               "--rssi-rate", str(args.rssi_rate), "--connect-latency", str(args.connect_latency),
+               "--seed", str(args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    if process.stdout.readline().strip() != "ready":
+        raise RuntimeError("simulated BlueZ did not start")
+    return process
+
+def enroll_known_devices(db_path, count):
+    store = DeviceStore(db_path)
+    for i in range(count):
+        address = known_address(i)
+        name = f"Known phone {i}"
+        store.upsert(derive_device_id(name, address), address, name, "")
+    store.close()
+
+def sim_stats(sim):
+    return {str(call): int(count) for call, count in sim.GetStats().items()}
+
+async def wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.001)
+    return True
+
+async def run(args, bus):
+    sim = dbus.Interface(bus.get_object(BLUEZ_SERVICE_NAME, "/"), SIM_IFACE)
+    db_path = os.path.join(tempfile.mkdtemp(), "paired_devices.db")
+    enroll_known_devices(db_path, args.known)
+
+    manager = BluetoothManager(bus=bus, db_path=db_path, scan_interval=args.scan_interval,
+                               presence_mode=args.presence_mode)
+
+    tick_latencies = []
+    check_for_devices = manager.check_for_devices
+    def timed_check_for_devices():
+        started = time.perf_counter()
+        check_for_devices()
+        tick_latencies.append(time.perf_counter() - started)
+    manager.check_for_devices = timed_check_for_devices
+
+    # get_readings reads a component's view, as the module does
+    view = PresenceView("bench", device_present_linger=manager.device_present_linger)
+    manager.views.append(view)
+    view.attach(manager)
+
+    task = asyncio.ensure_future(manager.start())
+    if not await wait_for(lambda: manager.running, 30):
+        raise RuntimeError("BluetoothManager did not start")
+
+    # steady state: ticks, D-Bus calls and database writes
+    sim.ResetStats()
+    tick_latencies.clear()
+    writes_before = manager.store.writes
+    readings_latencies = []
+    started = time.monotonic()
+    while time.monotonic() - started < args.duration:
+        # get_readings is only a snapshot lookup, poll it hard to measure it under load
+        before = time.perf_counter()
+        view.readings()
+        readings_latencies.append(time.perf_counter() - before)
+        await asyncio.sleep(1.0 / args.readings_rate)
+    elapsed = time.monotonic() - started
+    calls = {call: count for call, count in sim_stats(sim).items() if not call.startswith("Sim")}
+    writes = manager.store.writes - writes_before
+
+    # is_known_device on its own, for enrolled and for ambient devices
+    known_latencies = []
+    unknown_latencies = []
+    for path, props in list(manager.cache.devices())[:args.lookups]:
+        address = str(props["Address"])
+        name = str(props.get("Name", "<unknown>"))
+        before = time.perf_counter()
+        known = manager.is_known_device(derive_device_id(name, address), address, name, "")
+        (known_latencies if known else unknown_latencies).append(time.perf_counter() - before)
+
+    # pairing flow
+    pairing = []
+    accept = []
+    for i in range(args.pairings):
+        before = time.perf_counter()
+        path = str(sim.RequestPairing(f"New phone {i}"))
+        found = await wait_for(lambda: path in manager.pairing_requests, 5)
+        if not found:
+            continue
+        pairing.append(time.perf_counter() - before)
+        before = time.perf_counter()
+        manager.accept_pairing_request(path, "")
+        accept.append(time.perf_counter() - before)
+
+    manager.stop()
+    await asyncio.wait_for(task, 10)
+
+    ticks = max(1, len(tick_latencies))
+    return {
+        "scenario": {
+            "known": args.known,
+            "ambient": args.ambient,
+            "presence_mode": args.presence_mode,
+            "duration_s": round(elapsed, 1)
+        },
+        "tick_latency": percentiles(tick_latencies),
+        "dbus_calls_per_tick": round(sum(calls.values()) / ticks, 2),
+        "dbus_calls": calls,
+        "get_readings_latency": percentiles(readings_latencies),
+        "sqlite_writes_per_minute": round(writes * 60 / elapsed, 2),
+        "is_known_device_latency": {
+            "known": percentiles(known_latencies),
+            "unknown": percentiles(unknown_latencies)
+        },
+        "pairing_request_latency": percentiles(pairing),
+        "accept_pairing_request_latency": percentiles(accept),
+        "present_devices": len(manager.registry.present)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the presence engine against a simulated BlueZ")
+    parser.add_argument("--known", type=int, default=50)
+    parser.add_argument("--ambient", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of steady state to measure")
+    parser.add_argument("--scan-interval", type=float, default=1.0)
+    parser.add_argument("--presence-mode", default="connect")
+    parser.add_argument("--rssi-rate", type=float, default=10.0)
+    parser.add_argument("--connect-latency", type=float, default=0.3)
+    parser.add_argument("--readings-rate", type=float, default=100.0, help="get_readings calls per second")
+    parser.add_argument("--lookups", type=int, default=1000, help="is_known_device calls to time")
+    parser.add_argument("--pairings", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the results to this file")
+    args = parser.parse_args()
+
+    bus_process, address = start_bus()
+    bluez_process = None
+    try:
+        bluez_process = start_fake_bluez(address, args)
+        dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+        bus = dbus.bus.BusConnection(address)
+        results = asyncio.run(run(args, bus))
+    finally:
+        if bluez_process:
+            bluez_process.terminate()
+        bus_process.terminate()
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    sys.exit(main())
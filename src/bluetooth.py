@@ -17,36 +17,58 @@ from viam.components.sensor import Sensor
 from viam.logging import getLogger
 
 import time
-import sqlite3
 import asyncio
 import dbus
 import dbus.exceptions
 import dbus.mainloop.glib
 import dbus.service
-import uuid
 from pathlib import Path
-import datetime
 import subprocess
 import os
 import signal
 
-try:
-    from gi.repository import GLib
-except ImportError:
-    import glib as GLib
-
-BLUEZ_SERVICE_NAME = 'org.bluez'
-GATT_MANAGER_IFACE = 'org.bluez.GattManager1'
-LE_ADVERTISING_MANAGER_IFACE = 'org.bluez.LEAdvertisingManager1'
-LE_ADVERTISEMENT_IFACE = 'org.bluez.LEAdvertisement1'
-GATT_SERVICE_IFACE = 'org.bluez.GattService1'
-GATT_CHRC_IFACE = 'org.bluez.GattCharacteristic1'
-DBUS_OM_IFACE = 'org.freedesktop.DBus.ObjectManager'
-DBUS_PROP_IFACE = 'org.freedesktop.DBus.Properties'
-DEVICE_IFACE = 'org.bluez.Device1'
-ADAPTER_IFACE = 'org.bluez.Adapter1'
-AGENT_IFACE = 'org.bluez.Agent1'
-AGENT_MANAGER_IFACE = 'org.bluez.AgentManager1'
+from .constants import (
+    BLUEZ_SERVICE_NAME, GATT_MANAGER_IFACE, LE_ADVERTISING_MANAGER_IFACE, LE_ADVERTISEMENT_IFACE,
+    GATT_SERVICE_IFACE, GATT_CHRC_IFACE, DBUS_OM_IFACE, DBUS_PROP_IFACE, DEVICE_IFACE, ADAPTER_IFACE,
+    AGENT_IFACE, AGENT_MANAGER_IFACE
+)
+
+PRESENCE_MODES = ("connect", "passive")
+EXECUTION_MODES = ("inline", "thread")
+# settings that reconfigure hands straight to the signal model and probe scheduler
+SIGNAL_SETTINGS = {
+    "rssi_smoothing": "alpha",
+    "rssi_enter_threshold": "enter_rssi",
+    "rssi_exit_threshold": "exit_rssi",
+    "tx_power": "tx_power",
+    "path_loss_exponent": "path_loss_exponent"
+}
+PROBE_SETTINGS = {
+    "probe_max_in_flight": "max_in_flight",
+    "probe_rate": "probes_per_second",
+    "probe_backoff_max": "backoff_max",
+    "probe_timeout": "connect_timeout"
+}
+# Device1 properties BlueZ updates when it receives an advertisement during discovery
+ADVERTISEMENT_PROPERTIES = ("RSSI", "ManufacturerData", "ServiceData")
+from .bluez_cache import BluezObjectCache
+from .glib_bridge import GLibAsyncioBridge
+from .probe_scheduler import ProbeScheduler, adapter_of
+from .persistence import DeviceStore, SYNCHRONOUS_LEVELS
+from .registry import DeviceRegistry, derive_device_id, device_identity
+from .irk import IrkResolver, read_irk
+from .signal_model import SignalModel
+from .presence_expiry import PresenceExpiry
+from .metrics import Metrics, timed
+from .readiness import wait_for_bluez
+from .presence_view import PresenceView
+from .pairing_store import PairingStore
+from .device_gc import DeviceCollector
+from .engine_thread import EngineThread
+from .gatt_checkin import CheckInApplication
+from .duty_cycle import DutyCycle, DISCOVERY
+from .device_io import parse_devices, format_devices, EXPORT_FORMATS
+from .pairing_cleanup import PairingCleanup, CLEANUP_POLICIES
 
 LOGGER = getLogger(__name__)
 
@@ -105,13 +127,6 @@ def enable_onboard_bluetooth():
         LOGGER.warning(f"Error attempting to enable onboard Bluetooth: {str(e)}")
         return False
 
-# Activate GPIO for onboard Bluetooth at module load time (before adapter detection)
-try:
-    LOGGER.info("Attempting to enable onboard Bluetooth...")
-    enable_onboard_bluetooth()
-except Exception as e:
-    LOGGER.error(f"Error during onboard Bluetooth initialization: {e}")
-
 # the plugin a2dp seems to "take over" device audio, so we take over the bluetoothd
 # to disable plugin, preventing this from happening.  
 def restart_bluetooth_without_a2dp():
@@ -123,7 +138,6 @@ def restart_bluetooth_without_a2dp():
     bluetoothd_process = subprocess.Popen(["bluetoothd", "-P", "a2dp"])
     with open(PID_FILE, "w") as f:
         f.write(str(bluetoothd_process.pid))
-    time.sleep(5)
 
 def stop_bluetoothd_if_running():
     if os.path.exists(PID_FILE):
@@ -136,6 +150,25 @@ def stop_bluetoothd_if_running():
                 # process doesn't exist, remove stale PID file
                 os.remove(PID_FILE)
 
+hardware_prepared = False
+
+# Enables the onboard adapter (before adapter detection) and restarts bluetoothd without a2dp.
+# Done once per process, on first use rather than at import, and in an executor since it spawns
+# blocking subprocesses.  Readiness is then detected by wait_for_bluez instead of a fixed sleep.
+async def prepare_bluetooth():
+    global hardware_prepared
+    if hardware_prepared:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        LOGGER.info("Attempting to enable onboard Bluetooth...")
+        await loop.run_in_executor(None, enable_onboard_bluetooth)
+    except Exception as e:
+        LOGGER.error(f"Error during onboard Bluetooth initialization: {e}")
+    await loop.run_in_executor(None, restart_bluetooth_without_a2dp)
+    # only once both steps went through, a failed restart is tried again on the next start
+    hardware_prepared = True
+
 class bluetooth(Sensor, Reconfigurable):
     MODEL: ClassVar[Model] = Model(ModelFamily("viam-soleng", "presence"), "bluetooth")
     
@@ -143,15 +176,54 @@ class bluetooth(Sensor, Reconfigurable):
     advertisement = None
     agent = None
     discovery_active = False
-    manager = None
     bus = None
+    engine = None
+    view = None
     pairing_accept_timeout = int
     device_present_linger = int
+    scan_interval = float
+    probe_max_in_flight = int
+    probe_rate = float
+    probe_backoff_max = float
+    probe_timeout = float
+    db_flush_interval = float
+    db_synchronous = str
+    last_seen_resolution = float
+    presence_mode = str
+    passive_rssi_floor = int
+    passive_connect_fallback = bool
+    rssi_smoothing = float
+    rssi_enter_threshold = float
+    rssi_exit_threshold = float
+    tx_power = float
+    path_loss_exponent = float
+    departure_grace = float
+    event_log_size = int
+    metrics_enabled = bool
+    metrics_textfile = str
+    startup_timeout = float
+    devices = list
+    adapters = list
+    stale_device_age = float
+    max_tracked_devices = int
+    stale_device_batch_size = int
+    stale_device_interval = float
+    discovery_rssi = int
+    discovery_pathloss = int
+    discovery_uuids = list
+    discovery_duplicate_data = bool
+    execution_mode = str
+    checkin_service = bool
+    checkin_token = str
+    duty_cycle_period = float
+    duty_cycle_min_discovery = float
+    duty_cycle_max_discovery = float
+    pairing_cleanup = str
+    pairing_cleanup_rate = float
 
     # Constructor
     @classmethod
     def new(cls, config: ComponentConfig, dependencies: Mapping[ResourceName, ResourceBase]) -> Self:
-        restart_bluetooth_without_a2dp()
         my_class = cls(config.name)
         my_class.reconfigure(config, dependencies)
         return my_class
@@ -159,45 +231,139 @@ class bluetooth(Sensor, Reconfigurable):
     # Validates JSON Configuration
     @classmethod
     def validate(cls, config: ComponentConfig):
+        db_synchronous = config.attributes.fields["db_synchronous"].string_value
+        if db_synchronous and db_synchronous.upper() not in SYNCHRONOUS_LEVELS:
+            raise Exception(f"db_synchronous must be one of {', '.join(SYNCHRONOUS_LEVELS)}")
+        presence_mode = config.attributes.fields["presence_mode"].string_value
+        if presence_mode and presence_mode not in PRESENCE_MODES:
+            raise Exception(f"presence_mode must be one of {', '.join(PRESENCE_MODES)}")
+        if config.attributes.fields["discovery_rssi"].number_value and config.attributes.fields["discovery_pathloss"].number_value:
+            raise Exception("discovery_rssi and discovery_pathloss cannot be used together")
+        execution_mode = config.attributes.fields["execution_mode"].string_value
+        if execution_mode and execution_mode not in EXECUTION_MODES:
+            raise Exception(f"execution_mode must be one of {', '.join(EXECUTION_MODES)}")
+        if config.attributes.fields["stale_device_batch_size"].number_value < 0 or config.attributes.fields["stale_device_interval"].number_value < 0:
+            raise Exception("stale_device_batch_size and stale_device_interval cannot be negative")
+        pairing_cleanup = config.attributes.fields["pairing_cleanup"].string_value
+        if pairing_cleanup and pairing_cleanup not in CLEANUP_POLICIES:
+            raise Exception(f"pairing_cleanup must be one of {', '.join(CLEANUP_POLICIES)}")
+        # check-ins need an encrypted link, removing the bonds of known devices would break them
+        if config.attributes.fields["checkin_service"].bool_value and pairing_cleanup in ("device", "all"):
+            raise Exception("checkin_service needs pairing_cleanup none or unknown, known devices must stay bonded")
+        min_discovery = config.attributes.fields["duty_cycle_min_discovery"].number_value or 0.2
+        max_discovery = config.attributes.fields["duty_cycle_max_discovery"].number_value or 0.8
+        if not 0 < min_discovery <= max_discovery < 1:
+            raise Exception("duty_cycle_min_discovery and duty_cycle_max_discovery must be between 0 and 1, min not above max")
         return
 
     # Handles attribute reconfiguration
     def reconfigure(self, config: ComponentConfig, dependencies: Mapping[ResourceName, ResourceBase]):
-        if self.manager:
-            self.manager.running = False
-            self.manager.stop()
-
         self.advertisement_name = config.attributes.fields["advertisement_name"].string_value or "Viam Presence"
         self.pairing_accept_timeout = int(config.attributes.fields["pairing_accept_timeout"].number_value) or 60
         self.device_present_linger = int(config.attributes.fields["device_present_linger"].number_value) or 30
+        self.scan_interval = config.attributes.fields["scan_interval"].number_value or 1
+        self.probe_max_in_flight = int(config.attributes.fields["probe_max_in_flight"].number_value) or 4
+        self.probe_rate = config.attributes.fields["probe_rate"].number_value or 2
+        self.probe_backoff_max = config.attributes.fields["probe_backoff_max"].number_value or 300
+        self.probe_timeout = config.attributes.fields["probe_timeout"].number_value or 10
+        self.db_flush_interval = config.attributes.fields["db_flush_interval"].number_value or 30
+        self.db_synchronous = (config.attributes.fields["db_synchronous"].string_value or "NORMAL").upper()
+        self.last_seen_resolution = config.attributes.fields["last_seen_resolution"].number_value or 60
+        self.presence_mode = config.attributes.fields["presence_mode"].string_value or "connect"
+        self.passive_rssi_floor = int(config.attributes.fields["passive_rssi_floor"].number_value) or -90
+        self.passive_connect_fallback = config.attributes.fields["passive_connect_fallback"].bool_value
+        self.rssi_smoothing = config.attributes.fields["rssi_smoothing"].number_value or 0.3
+        self.rssi_enter_threshold = config.attributes.fields["rssi_enter_threshold"].number_value or -80
+        self.rssi_exit_threshold = config.attributes.fields["rssi_exit_threshold"].number_value or -88
+        self.tx_power = config.attributes.fields["tx_power"].number_value or -59
+        self.path_loss_exponent = config.attributes.fields["path_loss_exponent"].number_value or 2
+        self.departure_grace = config.attributes.fields["departure_grace"].number_value
+        self.event_log_size = int(config.attributes.fields["event_log_size"].number_value) or 1000
+        self.metrics_enabled = config.attributes.fields["metrics_enabled"].bool_value
+        self.metrics_textfile = config.attributes.fields["metrics_textfile"].string_value
+        self.startup_timeout = config.attributes.fields["startup_timeout"].number_value or 30
+        self.devices = [value.string_value for value in config.attributes.fields["devices"].list_value.values]
+        self.adapters = [value.string_value for value in config.attributes.fields["adapters"].list_value.values]
+        self.stale_device_age = config.attributes.fields["stale_device_age"].number_value or 300
+        self.max_tracked_devices = int(config.attributes.fields["max_tracked_devices"].number_value) or 1000
+        self.stale_device_batch_size = int(config.attributes.fields["stale_device_batch_size"].number_value) or 50
+        self.stale_device_interval = config.attributes.fields["stale_device_interval"].number_value or 30
+        self.discovery_rssi = int(config.attributes.fields["discovery_rssi"].number_value)
+        self.discovery_pathloss = int(config.attributes.fields["discovery_pathloss"].number_value)
+        self.discovery_uuids = [value.string_value for value in config.attributes.fields["discovery_uuids"].list_value.values]
+        # BlueZ reports every advertisement by default
+        self.discovery_duplicate_data = True
+        if "discovery_duplicate_data" in config.attributes.fields:
+            self.discovery_duplicate_data = config.attributes.fields["discovery_duplicate_data"].bool_value
+        self.execution_mode = config.attributes.fields["execution_mode"].string_value or "inline"
+        self.checkin_service = config.attributes.fields["checkin_service"].bool_value
+        self.checkin_token = config.attributes.fields["checkin_token"].string_value
+        self.duty_cycle_period = config.attributes.fields["duty_cycle_period"].number_value
+        self.duty_cycle_min_discovery = config.attributes.fields["duty_cycle_min_discovery"].number_value or 0.2
+        self.duty_cycle_max_discovery = config.attributes.fields["duty_cycle_max_discovery"].number_value or 0.8
+        self.pairing_cleanup = config.attributes.fields["pairing_cleanup"].string_value or \
+            ("unknown" if self.checkin_service else "device")
+        self.pairing_cleanup_rate = config.attributes.fields["pairing_cleanup_rate"].number_value or 5
+
+        if self.view:
+            self.view.resize_events(self.event_log_size)
+            self.view.reconfigure(self.device_present_linger, self.devices)
+            self.engine.call(self.view.apply_devices)
+            if self.engine.execution_mode != self.execution_mode:
+                LOGGER.warning(f"execution_mode {self.execution_mode} applies after a restart")
+            self.engine.configure(self.manager_settings())
+            return
+        self.view = PresenceView(self.name, device_present_linger=self.device_present_linger, devices=self.devices,
+                                 event_log_size=self.event_log_size)
         try:
-            asyncio.ensure_future(self.start_btmanager())
+            self.engine = SharedEngine.acquire(DEFAULT_ENGINE, self.view, self.manager_settings(), self.execution_mode)
         except Exception as e:
             LOGGER.error(f"Error initializing or running BluetoothManager: {e}")
-        finally:
-            if self.manager:
-                self.manager.stop()
         return
+
+    @property
+    def manager(self):
+        return self.engine.manager if self.engine else None
+
+    def manager_settings(self):
+        return dict(custom_name=self.advertisement_name,
+                    pairing_accept_timeout=self.pairing_accept_timeout, device_present_linger=self.device_present_linger,
+                    scan_interval=self.scan_interval, probe_max_in_flight=self.probe_max_in_flight,
+                    probe_rate=self.probe_rate, probe_backoff_max=self.probe_backoff_max,
+                    probe_timeout=self.probe_timeout, db_flush_interval=self.db_flush_interval,
+                    db_synchronous=self.db_synchronous, last_seen_resolution=self.last_seen_resolution,
+                    presence_mode=self.presence_mode, passive_rssi_floor=self.passive_rssi_floor,
+                    passive_connect_fallback=self.passive_connect_fallback, rssi_smoothing=self.rssi_smoothing,
+                    rssi_enter_threshold=self.rssi_enter_threshold, rssi_exit_threshold=self.rssi_exit_threshold,
+                    tx_power=self.tx_power, path_loss_exponent=self.path_loss_exponent,
+                    departure_grace=self.departure_grace,
+                    metrics_enabled=self.metrics_enabled, metrics_textfile=self.metrics_textfile,
+                    startup_timeout=self.startup_timeout, adapters=self.adapters,
+                    stale_device_age=self.stale_device_age, max_tracked_devices=self.max_tracked_devices,
+                    stale_device_batch_size=self.stale_device_batch_size, stale_device_interval=self.stale_device_interval,
+                    discovery_rssi=self.discovery_rssi, discovery_pathloss=self.discovery_pathloss,
+                    discovery_uuids=self.discovery_uuids, discovery_duplicate_data=self.discovery_duplicate_data,
+                    checkin_service=self.checkin_service, checkin_token=self.checkin_token,
+                    duty_cycle_period=self.duty_cycle_period, duty_cycle_min_discovery=self.duty_cycle_min_discovery,
+                    duty_cycle_max_discovery=self.duty_cycle_max_discovery, pairing_cleanup=self.pairing_cleanup,
+                    pairing_cleanup_rate=self.pairing_cleanup_rate)
     
     async def close(self):
-        self.manager.stop()
+        if self.engine:
+            self.engine.release(self.view)
+            self.engine = None
         return await super().close()
-    
-    async def start_btmanager(self):
-        self.manager = BluetoothManager(auto_accept=False, custom_name=self.advertisement_name,
-                                        pairing_accept_timeout=self.pairing_accept_timeout, device_present_linger=self.device_present_linger)
-        self.bus = dbus.SystemBus()
-        await self.manager.start()
 
     async def get_readings(
         self, *, extra: Optional[Mapping[str, Any]] = None, timeout: Optional[float] = None, **kwargs
     ) -> Mapping[str, SensorReading]:
-        ret = { 
-            "present_devices": self.manager.present_devices,
-            "known_devices": self.manager.paired_devices,
-            "pairing_requests": self.manager.current_pairing_requests()
-        }
-        return ret
+        if extra and "changes_since" in extra:
+            # only what changed since the caller's last sequence number
+            return self.view.changes(extra["changes_since"], extra.get("limit"), extra.get("changes_epoch"))
+        snapshot = self.view.readings()
+        if extra:
+            return snapshot.filtered(extra)
+        return snapshot.readings
 
     async def do_command(
                 self,
@@ -212,11 +378,186 @@ class bluetooth(Sensor, Reconfigurable):
                 label = ""
                 if "label" in command:
                     label = command["label"]
-                paired = self.manager.accept_pairing_request(command["device"], label)
-                return { "paired": paired }
+                paired = await self.engine.run(self.manager.accept_pairing_request, command["device"], label)
+                return { "paired": paired, "cleanup": await self.engine.run(self.manager.cleanup.progress) }
+            if command['command'] == 'accept_pairing_requests':
+                # devices: device paths, or {"device": ..., "label": ...} dictionaries
+                requests = []
+                for entry in command["devices"]:
+                    if isinstance(entry, str):
+                        requests.append((entry, ""))
+                    else:
+                        requests.append((entry["device"], entry.get("label", "")))
+                paired = await self.engine.run(self.manager.accept_pairing_requests, requests)
+                return { "paired": paired, "cleanup": await self.engine.run(self.manager.cleanup.progress) }
             if command['command'] == 'forget_device':
-                forgot = self.manager.forget_device(command["device"])  
+                forgot = await self.engine.run(self.manager.forget_device, command["device"])
                 return { "forgot": forgot }
+            if command['command'] == 'changes':
+                return self.view.changes(command.get("since", 0), command.get("limit"), command.get("epoch"))
+            if command['command'] == 'metrics':
+                return await self.engine.run(self.manager.metrics.snapshot)
+            if command['command'] == 'import_devices':
+                # devices: a list of {id, address, name, uuid, irk} objects, csv: the same as CSV text
+                rows, errors = parse_devices(command.get("devices"), command.get("csv"))
+                imported = await self.engine.run(self.manager.import_devices, rows)
+                return { "imported": imported, "skipped": errors }
+            if command['command'] == 'export_devices':
+                export_format = command.get("format", "json")
+                if export_format not in EXPORT_FORMATS:
+                    raise Exception(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+                return { "devices": await self.engine.run(self.manager.export_devices, export_format) }
+            if command['command'] == 'pairing_cleanup':
+                return await self.engine.run(self.manager.cleanup.progress)
+            if command['command'] == 'duty_cycle':
+                return await self.engine.run(self.manager.duty.stats)
+
+# every component shares one engine, which itself uses every selected adapter
+DEFAULT_ENGINE = "default"
+
+# One BluetoothManager shared by every sensor component: one scan loop, one agent, one
+# advertisement, one object cache and one database connection.  Each component attaches a
+# PresenceView; the manager is started with the first view and stopped when the last one is
+# released.  Engine-wide attributes come from the component that was (re)configured last, the
+# manager lingers for as long as the longest view so that every view can apply its own linger.
+#
+# In the "thread" execution mode the manager runs on an EngineThread: everything that touches it
+# is handed over with call() (fire and forget) or run() (do_command, awaits the result).
+class SharedEngine:
+    engines = {}
+
+    def __init__(self, key, execution_mode="inline"):
+        self.key = key
+        self.execution_mode = execution_mode
+        self.thread = EngineThread(f"bluetooth-engine-{key}") if execution_mode == "thread" else None
+        self.manager = None
+        # the components' views, the manager keeps its own list on its side
+        self.views = []
+        self.settings = {}
+        self.applied = {}
+        self.starting = None
+
+    @classmethod
+    def acquire(cls, key, view, settings, execution_mode="inline"):
+        engine = cls.engines.get(key)
+        if engine is None:
+            engine = cls.engines[key] = cls(key, execution_mode)
+        elif engine.execution_mode != execution_mode:
+            LOGGER.warning(f"Bluetooth engine already runs {engine.execution_mode}, execution_mode {execution_mode} applies after a restart")
+        view.threaded = engine.thread is not None
+        engine.views.append(view)
+        engine.call(engine.attach_view, view)
+        engine.configure(settings)
+        return engine
+
+    def call(self, fn, *args):
+        if self.thread:
+            self.thread.call(fn, *args)
+        else:
+            fn(*args)
+
+    async def run(self, fn, *args):
+        if self.thread:
+            return await self.thread.run(fn, *args)
+        return fn(*args)
+
+    def attach_view(self, view):
+        if self.manager and view not in self.manager.views:
+            self.manager.views.append(view)
+            view.attach(self.manager)
+
+    def detach_view(self, view):
+        if self.manager and view in self.manager.views:
+            self.manager.views.remove(view)
+        view.detach()
+
+    def release(self, view):
+        if view in self.views:
+            self.views.remove(view)
+        self.call(self.detach_view, view)
+        if self.views:
+            # the longest linger may have gone with it
+            self.configure(self.settings)
+            return
+        if SharedEngine.engines.get(self.key) is self:
+            del SharedEngine.engines[self.key]
+        if self.starting and not self.starting.done():
+            self.starting.cancel()
+        self.call(self.stop_manager)
+
+    def stop_manager(self):
+        if self.manager:
+            self.manager.stop()
+            self.manager = None
+        if self.thread:
+            # let the manager's main loop wind down before the thread's loop goes
+            asyncio.get_running_loop().call_later(self.applied.get("scan_interval", 1) + 1, self.thread.stop)
+
+    def effective_settings(self):
+        settings = dict(self.settings)
+        settings["device_present_linger"] = max(view.device_present_linger for view in self.views)
+        return settings
+
+    def configure(self, settings):
+        self.settings = settings
+        if self.manager:
+            # apply only what changed to the running manager, keeping presence state, the object cache,
+            # the database connection, the agent and any connections
+            changed = self.settings_changed()
+            if changed:
+                self.call(self.manager.reconfigure, changed)
+            return
+        if self.starting and not self.starting.done():
+            # still waiting for BlueZ, the manager is built from the latest settings once it is ready
+            return
+        if self.thread:
+            self.starting = self.thread.submit(self.start())
+        else:
+            self.starting = asyncio.ensure_future(self.start())
+
+    def settings_changed(self):
+        settings = self.effective_settings()
+        changed = {name: value for name, value in settings.items() if self.applied.get(name) != value}
+        self.applied = settings
+        return changed
+
+    async def start(self):
+        manager = None
+        try:
+            await prepare_bluetooth()
+            dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+            await wait_for_bluez(dbus.SystemBus(), self.settings["startup_timeout"])
+            self.applied = self.effective_settings()
+            manager = BluetoothManager(auto_accept=False, **self.applied)
+            # on the engine thread readers only see published snapshots
+            manager.publish_snapshots = self.thread is not None
+            self.manager = manager
+            # a configure() on another thread may have come in while the manager was built from
+            # the settings before it, and returned since there was no manager yet
+            changed = self.settings_changed()
+            if changed:
+                manager.reconfigure(changed)
+            for view in list(self.views):
+                self.attach_view(view)
+            await manager.start()
+        except asyncio.CancelledError:
+            await self.discard(manager)
+            raise
+        except Exception as e:
+            LOGGER.error(f"Error initializing or running BluetoothManager: {e}")
+            await self.discard(manager)
+
+    async def discard(self, manager):
+        # a manager that failed is torn down, the next configure() starts a new one; one that
+        # release() already stopped is left alone
+        if manager is None or self.manager is not manager:
+            return
+        self.manager = None
+        for view in manager.views:
+            view.detach()
+        manager.stop()
+        if manager.glib_task:
+            await manager.glib_task
 
 class Advertisement(dbus.service.Object):
     PATH_BASE = '/org/bluez/example/advertisement'
@@ -269,11 +610,11 @@ class Advertisement(dbus.service.Object):
         LOGGER.info('%s: Released!', self.path)
 
 class Agent(dbus.service.Object):
-    def __init__(self, bus, path, auto_accept=False):
+    def __init__(self, bus, path, auto_accept=False, pairing_requests=None):
         self.bus = bus
         self.path = path
         self.auto_accept = auto_accept
-        self.pairing_requests = []
+        self.pairing_requests = pairing_requests if pairing_requests is not None else PairingStore()
         self.manager = None
         dbus.service.Object.__init__(self, bus, path)
 
@@ -314,7 +655,9 @@ class Agent(dbus.service.Object):
         if self.auto_accept:
             self.add_paired_device(device)
             return
-        self.pairing_requests.append({ "device": device, "passkey": passkey, "when": time.time() })
+        # BlueZ may ask again for the same device, that is still one request
+        if self.pairing_requests.add(device, passkey) and self.manager:
+            self.manager.emit("pairing_requested", str(device), passkey=passkey)
 
         return
 
@@ -325,71 +668,295 @@ class Agent(dbus.service.Object):
             LOGGER.error("BluetoothManager reference not set in Agent")
 
 class BluetoothManager:
-    def __init__(self, auto_accept=False, custom_name="Viam Presence", pairing_accept_timeout=60, device_present_linger=30):
+    def __init__(self, auto_accept=False, custom_name="Viam Presence", pairing_accept_timeout=60, device_present_linger=30,
+                 scan_interval=1, probe_max_in_flight=4, probe_rate=2, probe_backoff_max=300, probe_timeout=10,
+                 db_flush_interval=30, db_synchronous="NORMAL", last_seen_resolution=60,
+                 presence_mode="connect", passive_rssi_floor=-90, passive_connect_fallback=False,
+                 rssi_smoothing=0.3, rssi_enter_threshold=-80, rssi_exit_threshold=-88, tx_power=-59, path_loss_exponent=2,
+                 departure_grace=0, metrics_enabled=False, metrics_textfile="",
+                 startup_timeout=30, adapters=(), stale_device_age=300, max_tracked_devices=1000,
+                 stale_device_batch_size=50, stale_device_interval=30,
+                 discovery_rssi=0, discovery_pathloss=0, discovery_uuids=(), discovery_duplicate_data=True,
+                 checkin_service=False, checkin_token="", duty_cycle_period=0, duty_cycle_min_discovery=0.2,
+                 duty_cycle_max_discovery=0.8, pairing_cleanup="device", pairing_cleanup_rate=5, bus=None, db_path=None):
         dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
-        self.bus = dbus.SystemBus()
-        
+        # bus and db_path are only passed in to run against a simulated BlueZ, see bench/
+        self.bus = bus or dbus.SystemBus()
+        self.metrics = Metrics(enabled=metrics_enabled)
+        # node-exporter textfile collector output, written every metrics_textfile_interval seconds
+        self.metrics_textfile = metrics_textfile
+        self.metrics_textfile_interval = 15
+        self.metrics_written = 0
+
         self.om = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, "/"), DBUS_OM_IFACE)
-        self.adapter_path = self.find_adapter()
-        
+        self.cache = BluezObjectCache(self.bus, self.om, metrics=self.metrics)
+        self.cache.start()
+        # adapter names (hci0) or addresses to use, all adapters when empty
+        self.adapters = list(adapters)
+        self.adapter_paths = self.find_adapters()
+        # discovery runs on every adapter, pairing, the agent and the advertisement use the first one
+        self.adapter_path = self.adapter_paths[0] if self.adapter_paths else None
+        self.discovering = set()
+
         if self.adapter_path:
             self.adapter = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, self.adapter_path), ADAPTER_IFACE)
             self.adapter_props = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, self.adapter_path), DBUS_PROP_IFACE)
             self.agent_manager = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, "/org/bluez"), AGENT_MANAGER_IFACE)
             self.ad_manager = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, self.adapter_path), LE_ADVERTISING_MANAGER_IFACE)
+            self.gatt_manager = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, self.adapter_path), GATT_MANAGER_IFACE)
         else:
             LOGGER.error("No Bluetooth adapter found")
             raise RuntimeError("No Bluetooth adapter found")
 
-        self.paired_devices = {}
-        self.present_devices = {}
+        self.registry = DeviceRegistry()
+        self.resolver = IrkResolver()
+        self.signal = SignalModel(alpha=rssi_smoothing, enter_rssi=rssi_enter_threshold, exit_rssi=rssi_exit_threshold,
+                                  tx_power=tx_power, path_loss_exponent=path_loss_exponent, sample_timeout=device_present_linger)
         # we could make this configurable but it should be stable here
-        self.db_conn = sqlite3.connect( str(Path.home()) + '/.viam/paired_devices.db')        
-        self.create_db_table()
+        self.store = DeviceStore(db_path or str(Path.home()) + '/.viam/paired_devices.db', synchronous=db_synchronous,
+                                 flush_interval=db_flush_interval, last_seen_resolution=last_seen_resolution)
         self.advertisement = None
         self.agent = None
+        self.checkin_service = checkin_service
+        self.checkin_token = checkin_token
+        self.checkin_app = None
+        # address -> time of the last check-in, such devices are not probed while they linger
+        self.checked_in = {}
         self.auto_accept = auto_accept
-        self.discovery_active = False
         self.custom_name = custom_name
         self.pairing_accept_timeout = pairing_accept_timeout
+        self.pairing_requests = PairingStore(pairing_accept_timeout)
         self.device_present_linger = device_present_linger
+        self.scan_interval = scan_interval
+        self.presence_mode = presence_mode
+        self.passive_rssi_floor = passive_rssi_floor
+        self.passive_connect_fallback = passive_connect_fallback
+        # when non-zero, a disconnect or removal from BlueZ cuts the remaining linger down to this many seconds
+        self.departure_grace = departure_grace
+        self.discovery_rssi = discovery_rssi
+        self.discovery_pathloss = discovery_pathloss
+        self.discovery_uuids = list(discovery_uuids)
+        self.discovery_duplicate_data = discovery_duplicate_data
+        # device paths with advertisement updates since the last tick, handled once per tick each
+        self.pending_sightings = set()
+        self.startup_timeout = startup_timeout
+        self.expiry = PresenceExpiry(self.presence_expired)
+        # (readings, expires) shared by every view's snapshot, built once per change
+        self.readings = None
+        self.glib = GLibAsyncioBridge(metrics=self.metrics)
+        self.prober = ProbeScheduler(self.bus, max_in_flight=probe_max_in_flight, probes_per_second=probe_rate,
+                                     backoff_max=probe_backoff_max, connect_timeout=probe_timeout, metrics=self.metrics)
+        self.prober.adapter_count = len(self.adapter_paths)
+        self.collector = DeviceCollector(self.bus, self.cache, self.is_protected_device, max_age=stale_device_age,
+                                         max_objects=max_tracked_devices, batch_size=stale_device_batch_size,
+                                         interval=stale_device_interval, metrics=self.metrics)
+        self.cleanup = PairingCleanup(self.bus, self.cache, self.is_protected_device, policy=pairing_cleanup,
+                                      rate=pairing_cleanup_rate, metrics=self.metrics)
+        self.probe_candidates = []
+        self.duty = DutyCycle(duty_cycle_period, min_discovery=duty_cycle_min_discovery, max_discovery=duty_cycle_max_discovery)
+        # off during discovery windows
+        self.probing = True
+        self.running = False
+        self.glib_task = None
+        # PresenceViews of the sensor components sharing this manager
+        self.views = []
+        # set when running on an engine thread, views' snapshots are then rebuilt here and published
+        self.publish_snapshots = False
+        self.publish_scheduled = False
+        self.loop = None
+
+        self.cache.add_added_listener(self.interfaces_added)
+        self.cache.add_properties_listener(self.properties_changed)
+        self.cache.add_removed_listener(self.interfaces_removed)
+        self.metrics.add_collector(self.collect_metrics)
+
+    def discovery_filter(self):
+        discovery_filter = {'Transport': 'le'}
+        if not self.discovery_duplicate_data:
+            # BlueZ reports duplicates by default, and versions before DuplicateData reject unknown keys
+            discovery_filter['DuplicateData'] = dbus.Boolean(False)
+        if self.discovery_rssi:
+            discovery_filter['RSSI'] = dbus.Int16(self.discovery_rssi)
+        if self.discovery_pathloss:
+            discovery_filter['Pathloss'] = dbus.UInt16(self.discovery_pathloss)
+        if self.discovery_uuids:
+            discovery_filter['UUIDs'] = dbus.Array(self.discovery_uuids, signature='s')
+        return discovery_filter
+
+    def apply_discovery_filter(self):
+        for path in self.adapter_paths:
+            try:
+                self.metrics.inc("dbus_calls", method="SetDiscoveryFilter")
+                self.adapter_interface(path).SetDiscoveryFilter(self.discovery_filter())
+            except dbus.exceptions.DBusException as e:
+                LOGGER.error(f"Error setting discovery filter on {path}: {e}")
+
+    def interfaces_added(self, path, interfaces):
+        if ADAPTER_IFACE in interfaces and path not in self.adapter_paths and self.adapter_selected(path, interfaces[ADAPTER_IFACE]):
+            # a dongle plugged in after start, discovery starts on it with the next scan
+            LOGGER.info(f"Bluetooth adapter added: {path}")
+            self.adapter_paths.append(path)
+            self.prober.adapter_count = len(self.adapter_paths)
+            if self.running:
+                self.prepare_adapter(path)
+        if DEVICE_IFACE in interfaces and "RSSI" in interfaces[DEVICE_IFACE]:
+            self.pending_sightings.add(path)
 
-        self.bus.add_signal_receiver(
-                    self.properties_changed,
-                    dbus_interface="org.freedesktop.DBus.Properties",
-                    signal_name="PropertiesChanged",
-                    path_keyword="path"
-                )
-        
     def properties_changed(self, interface, changed, invalidated, path):
         if interface != DEVICE_IFACE:
             return
-        if "Connected" in changed:            
-            for i, request in enumerate(self.agent.pairing_requests):
-                if path == request["device"]:
-                    LOGGER.info("PAIRING")
-                    return
+        if any(prop in changed for prop in ADVERTISEMENT_PROPERTIES):
+            # a busy device changes RSSI many times per tick, only its latest state matters
+            self.pending_sightings.add(path)
+        if "Connected" in changed:
+            if path in self.pairing_requests:
+                LOGGER.info("PAIRING")
+                return
+            if self.departure_grace and not changed["Connected"]:
+                self.device_departing(self.cache.get_device(path))
+                return
             self.update_present_device(path)
+
+    def interfaces_removed(self, path, removed):
+        if ADAPTER_IFACE in removed and path in self.adapter_paths and path != self.adapter_path:
+            LOGGER.info(f"Bluetooth adapter removed: {path}")
+            self.adapter_paths.remove(path)
+            self.discovering.discard(path)
+            self.prober.adapter_count = max(1, len(self.adapter_paths))
+        if self.departure_grace and DEVICE_IFACE in removed:
+            self.device_departing(removed[DEVICE_IFACE])
+
+    def device_departing(self, props):
+        if not props or "Address" not in props:
+            return
+        device_id = self.registry.id_for_address(str(props["Address"]))
+        if device_id is not None:
+            deadline = time.time() + self.departure_grace
+            self.expiry.shorten(device_id, deadline)
+            for view in self.views:
+                view.departing(device_id, deadline)
+
+    def mark_present(self, device_id, address, name, device_uuid, when):
+        self.registry.mark_present(device_id, address, name, device_uuid, when)
+        self.invalidate_snapshots()
+        self.expiry.schedule(device_id, when + self.device_present_linger)
+        for view in self.views:
+            view.sighted(device_id, address, name, when)
+
+    def presence_expired(self, device_id):
+        record = self.registry.present.pop(device_id, None)
+        if record:
+            LOGGER.debug(f"Device {device_id} is no longer present")
+            # the manager lingers for the longest of its views, so they have normally let go already
+            for view in self.views:
+                view.expired(device_id)
+            self.invalidate_snapshots()
+
+    def emit(self, event, device_id, **info):
+        for view in self.views:
+            view.record(event, device_id, **info)
+        self.invalidate_snapshots()
+
+    def invalidate_snapshots(self):
+        self.readings = None
+        for view in self.views:
+            view.snapshot.invalidate()
+        if self.publish_snapshots and self.loop and not self.publish_scheduled:
+            # once for everything that changes in this loop iteration
+            self.publish_scheduled = True
+            self.loop.call_soon(self.publish)
+
+    def publish(self):
+        self.publish_scheduled = False
+        for view in self.views:
+            view.snapshot.get()
             
-    def create_db_table(self):
-        cursor = self.db_conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS paired_devices (
-                id TEXT PRIMARY KEY,
-                address TEXT,
-                name TEXT,
-                uuid TEXT,
-                last_seen TIMESTAMP
-            )
-        ''')
-        self.db_conn.commit()
-
-    def find_adapter(self):
-        objects = self.om.GetManagedObjects()
-        for o, props in objects.items():
-            if ADAPTER_IFACE in props:
-                return o
-        return None
+    def advertisement_seen(self, path):
+        props = self.cache.get_device(path)
+        if not props or "Address" not in props or not self.uses_device(path):
+            return
+        device_id, address, name, device_uuid = device_identity(props)
+        record = self.match_known_device(device_id, address, device_uuid)
+        if not record:
+            return
+        self.prober.sighted(address)
+
+        rssi = props.get("RSSI")
+        if rssi is None or int(rssi) < self.passive_rssi_floor:
+            return
+        # presence is decided from the smoothed signal on the next tick
+        self.signal.add_sample(record.id, int(rssi), time.time())
+
+    def adapter_selected(self, path, props):
+        if not self.adapters:
+            return True
+        address = str(props.get("Address", "")).upper()
+        return any(name == path.rsplit("/", 1)[-1] or name.upper() == address for name in self.adapters)
+
+    def find_adapters(self):
+        return sorted(path for path, props in self.cache.adapters() if self.adapter_selected(path, props))
+
+    def uses_device(self, device_path):
+        return adapter_of(device_path) in self.adapter_paths
+
+    def adapter_interface(self, path, interface=ADAPTER_IFACE):
+        return dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, path), interface)
+
+    def prepare_adapter(self, path):
+        try:
+            props = self.adapter_interface(path, DBUS_PROP_IFACE)
+            self.metrics.inc("dbus_calls", method="Set")
+            props.Set(ADAPTER_IFACE, "Powered", dbus.Boolean(True))
+            self.metrics.inc("dbus_calls", method="SetDiscoveryFilter")
+            self.adapter_interface(path).SetDiscoveryFilter(self.discovery_filter())
+        except dbus.exceptions.DBusException as e:
+            LOGGER.error(f"Error preparing adapter {path}: {e}")
+
+    @property
+    def discovery_active(self):
+        return bool(self.discovering)
+
+    def start_discovery(self):
+        for path in self.adapter_paths:
+            if path in self.discovering:
+                continue
+            try:
+                self.metrics.inc("dbus_calls", method="StartDiscovery")
+                self.adapter_interface(path).StartDiscovery()
+                self.discovering.add(path)
+                LOGGER.debug(f"Discovery started on {path}")
+            except dbus.exceptions.DBusException as e:
+                LOGGER.error(f"Error starting discovery on {path}: {e}")
+
+    def stop_discovery(self):
+        for path in list(self.discovering):
+            self.discovering.discard(path)
+            try:
+                self.metrics.inc("dbus_calls", method="StopDiscovery")
+                self.adapter_interface(path).StopDiscovery()
+                LOGGER.debug(f"Discovery stopped on {path}")
+            except dbus.exceptions.DBusException as e:
+                LOGGER.error(f"Error stopping discovery on {path}: {e}")
+
+    def select_adapters(self, adapters):
+        self.adapters = list(adapters)
+        selected = self.find_adapters()
+        if self.adapter_path not in selected:
+            LOGGER.warning(f"{self.adapter_path} keeps pairing and advertising until the module restarts")
+            selected.insert(0, self.adapter_path)
+        for path in self.adapter_paths:
+            if path not in selected and path in self.discovering:
+                self.discovering.discard(path)
+                try:
+                    self.metrics.inc("dbus_calls", method="StopDiscovery")
+                    self.adapter_interface(path).StopDiscovery()
+                except dbus.exceptions.DBusException as e:
+                    LOGGER.error(f"Error stopping discovery on {path}: {e}")
+        for path in selected:
+            if path not in self.adapter_paths and self.running:
+                self.prepare_adapter(path)
+        self.adapter_paths = [self.adapter_path] + [path for path in selected if path != self.adapter_path]
+        self.prober.adapter_count = len(self.adapter_paths)
 
     def start_advertising(self):
         if self.advertisement:
@@ -405,6 +972,7 @@ class BluetoothManager:
         self.advertisement.include_tx_power = True
 
         try:
+            self.metrics.inc("dbus_calls", method="RegisterAdvertisement")
             self.ad_manager.RegisterAdvertisement(self.advertisement.get_path(), {},
                                                   reply_handler=self.register_ad_cb,
                                                   error_handler=self.register_ad_error_cb)
@@ -415,14 +983,72 @@ class BluetoothManager:
     def stop_advertising(self):
         if self.advertisement:
             try:
-                self.ad_manager.UnregisterAdvertisement(self.advertisement)
-                self.advertisement = None
+                self.metrics.inc("dbus_calls", method="UnregisterAdvertisement")
+                self.ad_manager.UnregisterAdvertisement(self.advertisement.get_path())
                 LOGGER.info("Advertisement stopped")
             except dbus.exceptions.DBusException as e:
                 LOGGER.error(f"Error unregistering advertisement: {e}")
+            finally:
+                # free the object path so the advertisement can be registered again, also when
+                # BlueZ already dropped it (adapter reset, bluetoothd restart)
+                self.advertisement.remove_from_connection()
+                self.advertisement = None
         else:
             LOGGER.warning("No advertisement running")
 
+    def start_checkin_service(self):
+        if self.checkin_app:
+            return
+        self.checkin_app = CheckInApplication(self.bus, self.check_in, self.checkin_token)
+        self.metrics.inc("dbus_calls", method="RegisterApplication")
+        self.gatt_manager.RegisterApplication(self.checkin_app.get_path(), {},
+                                              reply_handler=lambda: LOGGER.info("Check-in service registered"),
+                                              error_handler=self.register_checkin_error_cb)
+
+    def stop_checkin_service(self):
+        if not self.checkin_app:
+            return
+        try:
+            self.metrics.inc("dbus_calls", method="UnregisterApplication")
+            self.gatt_manager.UnregisterApplication(self.checkin_app.get_path())
+            LOGGER.info("Check-in service stopped")
+        except dbus.exceptions.DBusException as e:
+            LOGGER.error(f"Error unregistering check-in service: {e}")
+        self.checkin_app.remove()
+        self.checkin_app = None
+
+    def register_checkin_error_cb(self, error):
+        LOGGER.error(f"Failed to register check-in service: {error}")
+        if self.checkin_app:
+            self.checkin_app.remove()
+            self.checkin_app = None
+
+    def check_in(self, device_path):
+        # a companion app wrote to the check-in characteristic, returns the linger or None for unknown devices
+        props = self.cache.get_device(device_path)
+        if not props or "Address" not in props:
+            return None
+        device_id, address, name, device_uuid = device_identity(props)
+        record = self.match_known_device(device_id, address, device_uuid)
+        if not record:
+            LOGGER.debug(f"Check-in from unknown device {address}")
+            return None
+        now = time.time()
+        self.metrics.inc("checkins")
+        self.checked_in[address] = now
+        self.prober.sighted(address)
+        self.mark_present(record.id, address, record.name, record.uuid, now)
+        return self.device_present_linger
+
+    def checked_in_recently(self, address, now):
+        when = self.checked_in.get(address)
+        if when is None:
+            return False
+        if now - when < self.device_present_linger:
+            return True
+        del self.checked_in[address]
+        return False
+
     def register_ad_cb(self):
         LOGGER.debug("Advertisement registered")
 
@@ -430,70 +1056,66 @@ class BluetoothManager:
         LOGGER.error(f"Failed to register advertisement: {error}")
 
     def current_pairing_requests(self):
-        if not self.agent or not isinstance(self.agent.pairing_requests, list):
-            return []
-        
-        pairing_requests = []
-        current_time = time.time()
-        for i, request in enumerate(self.agent.pairing_requests):
-            if current_time - request["when"] < self.pairing_accept_timeout:
-                pairing_requests.append ({
-                    'passkey': request["passkey"],
-                    'device': str(request["device"]),
-                    'when': datetime.datetime.fromtimestamp(request["when"]).isoformat()
-                })
-            else:
-                del self.agent.pairing_requests[i]
-        return pairing_requests
-
-    def remove_physical_pairing(self, device_path):
-        try:
-            adapter = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, self.adapter_path), ADAPTER_IFACE)
-            adapter.RemoveDevice(device_path)
-            LOGGER.info(f"Successfully removed pairing for device: {device_path}")            
-            return True
-        except dbus.exceptions.DBusException as e:
-            LOGGER.error(f"Failed to remove pairing for device {device_path}: {e}")
-            return False
+        return self.pairing_requests.current()
+
+    def prune_pairing_requests(self):
+        self.pairing_requests.expire()
+
+    def shared_readings(self):
+        # the views filter these, they must not modify them
+        if self.readings is None or (self.readings[1] is not None and time.time() >= self.readings[1]):
+            readings = {
+                "present_devices": self.registry.present_devices(),
+                "known_devices": self.registry.known_devices(),
+                "pairing_requests": self.current_pairing_requests()
+            }
+            # the readings have to be rebuilt when their oldest pairing request expires
+            self.readings = (readings, self.pairing_requests.next_expiry())
+        return self.readings
 
     def remove_device_from_db(self, device_id):
-        cursor = self.db_conn.cursor()
-        cursor.execute('DELETE FROM paired_devices WHERE id = ?', (device_id,))
-        self.db_conn.commit()
+        self.store.delete(device_id)
         LOGGER.info(f"Removed device {device_id} from database")
 
-    def remove_all_physical_pairings(self):
-        objects = self.om.GetManagedObjects()
-        removed_count = 0
-        for path, interfaces in objects.items():
-            if DEVICE_IFACE in interfaces:
-                if self.remove_physical_pairing(path):
-                    removed_count += 1
-        LOGGER.info(f"Removed {removed_count} paired devices")
-        return removed_count
-
     def accept_pairing_request(self, device, label):
-        if self.agent:
-            paired = False
-            for i, request in enumerate(self.agent.pairing_requests):
-                if request["device"] == device:
-                    del self.agent.pairing_requests[i]
-                    self.add_paired_device(device, label)
-                    self.remove_all_physical_pairings()
-                    paired = True
-            if not paired:
-                LOGGER.warning(f"No pairing request found for device: {device}")
-            return paired
-        else:
+        return self.accept_pairing_requests([(device, label)])[device]
+
+    def accept_pairing_requests(self, requests):
+        # requests: (device path, label) pairs, returns device path -> whether it was paired
+        if not self.agent:
             LOGGER.error("Agent not initialized")
-            return False
+            return {device: False for device, label in requests}
+        paired = {}
+        for device, label in requests:
+            if device in paired:
+                # listed twice, the first entry decided
+                continue
+            if self.pairing_requests.pop(device) is None:
+                LOGGER.warning(f"No pairing request found for device: {device}")
+                paired[device] = False
+                continue
+            self.add_paired_device(device, label)
+            paired[device] = True
+        if any(paired.values()):
+            self.invalidate_snapshots()
+            # once for the whole batch, removals continue in the background
+            self.cleanup.schedule([device for device, ok in paired.items() if ok])
+            self.cleanup.step()
+        return paired
 
     def forget_device(self, device):
         if self.agent:
             forgot = False
-            if device in self.paired_devices:
+            if device in self.registry:
                 self.remove_device_from_db(device)
-                del self.paired_devices[device]
+                record = self.registry.remove_known(device)
+                self.resolver.remove_key(device)
+                self.signal.remove(device)
+                self.expiry.cancel(device)
+                for view in self.views:
+                    view.forgotten(device, record.address, record.name)
+                self.invalidate_snapshots()
+                self.prober.forget(record.address)
                 LOGGER.info(f"Known device forgotten: {device}")
                 forgot = True
             else:
@@ -504,66 +1126,78 @@ class BluetoothManager:
             return False
 
     def update_present_device(self, device_path):
-        device = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, device_path), DBUS_PROP_IFACE)
-        try:
-            address = device.Get(DEVICE_IFACE, "Address")
-            name = device.Get(DEVICE_IFACE, "Name")
-        except dbus.exceptions.DBusException:
+        props = self.cache.get_device(device_path) or {}
+        address = props.get("Address")
+        name = props.get("Name")
+        if address is None or name is None:
             LOGGER.error(f"Unable to get device properties for {device_path}")
             return
-        
-        uuids = device.Get(DEVICE_IFACE, "UUIDs")
-        device_uuid = uuids[0] if uuids else ""
-        device_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, name + address))
 
+        uuids = props.get("UUIDs", [])
+        device_uuid = uuids[0] if uuids else ""
         # device ID can be user selected, try to match on address
-        for stored_id, stored_info in self.paired_devices.items():
-            if address == stored_info["address"]:
-                device_id = stored_id
+        device_id = self.registry.id_for_address(address) or self.resolver.resolve(address) or derive_device_id(name, address)
 
-        self.present_devices[device_id] = {
-            'address': address,
-            'name': name,
-            'uuid': device_uuid,
-            'when': time.time()
-        }       
+        if device_id not in self.registry:
+            return
+        self.mark_present(device_id, address, name, device_uuid, time.time())
 
     def add_paired_device(self, device_path, label):
-        device = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, device_path), DBUS_PROP_IFACE)
-        try:
-            address = device.Get(DEVICE_IFACE, "Address")
-            name = device.Get(DEVICE_IFACE, "Name")
-        except dbus.exceptions.DBusException:
+        props = self.cache.get_device(device_path) or {}
+        address = props.get("Address")
+        name = props.get("Name")
+        if address is None or name is None:
             LOGGER.error(f"Unable to get device properties for {device_path}")
             return
 
-        uuids = device.Get(DEVICE_IFACE, "UUIDs")
+        uuids = props.get("UUIDs", [])
         device_uuid = uuids[0] if uuids else ""
-        device_id = label or str(uuid.uuid5(uuid.NAMESPACE_DNS, name + address))
-
-        self.paired_devices[device_id] = {
-            'address': address,
-            'name': name,
-            'uuid': device_uuid
-        }
-        self.update_device_in_db(device_id, address, name, device_uuid)
+        device_id = label or derive_device_id(name, address)
+        # the bond (and with it the key) may be removed right after accepting, so read it now
+        irk = self.read_device_irk(address, adapter_of(device_path))
+
+        self.registry.add_known(device_id, address, name, device_uuid, irk)
+        self.resolver.set_key(device_id, irk)
+        self.update_device_in_db(device_id, address, name, device_uuid, irk)
+        # a new enrolment should not wait for the next write-behind flush
+        self.store.flush()
+        self.emit("paired", device_id, address=address, name=name)
         LOGGER.info(f"Added paired device to database: {name} ({address})")
 
 
+    def import_devices(self, rows):
+        if not rows:
+            return 0
+        # an import without a key keeps the one already enrolled
+        rows = [(device_id, address, name, device_uuid, irk or getattr(self.registry.get(device_id), "irk", None))
+                for device_id, address, name, device_uuid, irk in rows]
+        imported = self.store.import_rows(rows)
+        self.registry.add_known_many(rows)
+        self.resolver.set_keys((row[0], row[4]) for row in rows)
+        self.invalidate_snapshots()
+        LOGGER.info(f"Imported {imported} devices")
+        return imported
+
+    def export_devices(self, export_format="json"):
+        return format_devices(self.registry.known.values(), export_format)
+
     async def start(self):
         LOGGER.info("Starting Bluetooth Manager...")
+        self.loop = asyncio.get_running_loop()
+        # dispatch D-Bus signals from the start, readiness below is detected from them
+        self.glib_task = asyncio.ensure_future(self.glib.run())
 
         # Clean up any existing D-Bus resources
         try:
             # Stop any existing discovery
             if self.discovery_active:
-                self.adapter.StopDiscovery()
-                self.discovery_active = False
+                self.stop_discovery()
                 LOGGER.info("Stopped existing discovery")
 
             # Unregister any existing agent
             if hasattr(self, 'agent') and self.agent is not None:
                 try:
+                    self.metrics.inc("dbus_calls", method="UnregisterAgent")
                     self.agent_manager.UnregisterAgent(self.agent.get_path())
                     self.agent.remove_from_connection(self.bus)
                     self.agent = None
@@ -574,150 +1208,379 @@ class BluetoothManager:
             # Unregister any existing advertisement
             if self.advertisement:
                 try:
+                    self.metrics.inc("dbus_calls", method="UnregisterAdvertisement")
                     self.ad_manager.UnregisterAdvertisement(self.advertisement.get_path())
                     self.advertisement = None
                     LOGGER.info("Unregistered existing advertisement")
                 except Exception as e:
                     LOGGER.info(f"No existing advertisement to unregister (or error): {e}")
 
-            # Add a small delay to let BlueZ settle
-            await asyncio.sleep(1)
-
         except Exception as e:
             LOGGER.warning(f"Error during cleanup: {e}")
 
         # Now proceed with normal startup
+        for path in self.adapter_paths[1:]:
+            self.prepare_adapter(path)
+        self.metrics.inc("dbus_calls", method="Set")
         self.adapter_props.Set(ADAPTER_IFACE, "Powered", dbus.Boolean(True))
+        await self.wait_for_powered()
+        self.metrics.inc("dbus_calls", method="Set")
         self.adapter_props.Set(ADAPTER_IFACE, "Discoverable", dbus.Boolean(True))
+        self.metrics.inc("dbus_calls", method="Set")
         self.adapter_props.Set(ADAPTER_IFACE, "DiscoverableTimeout", dbus.UInt32(0))
+        self.metrics.inc("dbus_calls", method="Set")
         self.adapter_props.Set(ADAPTER_IFACE, "Pairable", dbus.Boolean(True))
+        self.metrics.inc("dbus_calls", method="Set")
         self.adapter_props.Set(ADAPTER_IFACE, "Alias", self.custom_name)
 
         self.start_advertising()
+        if self.checkin_service:
+            self.start_checkin_service()
 
-        self.agent = Agent(self.bus, "/org/bluez/agent", auto_accept=self.auto_accept)
+        self.agent = Agent(self.bus, "/org/bluez/agent", auto_accept=self.auto_accept, pairing_requests=self.pairing_requests)
         self.agent.manager = self
         try:
+            self.metrics.inc("dbus_calls", method="RegisterAgent")
             self.agent_manager.RegisterAgent(self.agent.get_path(), "KeyboardDisplay")
             LOGGER.info("Agent registered with KeyboardDisplay")
+            self.metrics.inc("dbus_calls", method="RequestDefaultAgent")
             self.agent_manager.RequestDefaultAgent(self.agent.get_path())
             LOGGER.info("Agent set as default")
         except Exception as e:
             LOGGER.error(f"Failed to register agent: {e}")
             raise RuntimeError("Failed to register Bluetooth agent.")
 
-        self.adapter.SetDiscoveryFilter({'Transport': 'le'})
-        self.adapter.StartDiscovery()
-        self.discovery_active = True
+        self.metrics.inc("dbus_calls", method="SetDiscoveryFilter")
+        self.adapter.SetDiscoveryFilter(self.discovery_filter())
+        self.start_discovery()
 
-        LOGGER.info(f'Bluetooth Manager started with custom name "{self.custom_name}" and is now discoverable.')
+        LOGGER.info(f'Bluetooth Manager started with custom name "{self.custom_name}" on {", ".join(self.adapter_paths)} and is now discoverable.')
         self.load_paired_devices()
         self.running = True
         await self.main_loop()
 
 
     async def main_loop(self):
-        while self.running:
-            context = GLib.MainContext.default()
-            while context.pending():
-                context.iteration(False)
-            await self.periodic_scan()
-            await asyncio.sleep(1)
+        # D-Bus signals and agent calls are dispatched by the bridge as soon as they arrive,
+        # periodic scanning runs on its own schedule
+        self.expiry.start(asyncio.get_running_loop())
+        try:
+            while self.running:
+                await self.periodic_scan()
+                # the scan may have made blocking D-Bus calls that queued messages without
+                # leaving the socket readable, so have the bridge look again
+                self.glib.wake()
+                await asyncio.sleep(self.scan_interval)
+        finally:
+            self.expiry.stop()
+            self.glib.stop()
+            await self.glib_task
+
+    def reconfigure(self, changed):
+        for name, value in changed.items():
+            LOGGER.info(f"Reconfiguring {name}: {value}")
+            if name == "custom_name":
+                self.custom_name = value
+                if self.running:
+                    self.metrics.inc("dbus_calls", method="Set")
+                    self.adapter_props.Set(ADAPTER_IFACE, "Alias", value)
+                    # only the advertisement carries the name, the agent and discovery are left alone
+                    self.stop_advertising()
+                    self.start_advertising()
+            elif name == "device_present_linger":
+                # presence already granted keeps its deadline, new sightings use the new linger
+                self.device_present_linger = value
+                self.signal.sample_timeout = value
+            elif name in ("rssi_smoothing", "rssi_enter_threshold", "rssi_exit_threshold", "tx_power", "path_loss_exponent"):
+                setattr(self.signal, SIGNAL_SETTINGS[name], value)
+            elif name in ("probe_max_in_flight", "probe_rate", "probe_backoff_max", "probe_timeout"):
+                setattr(self.prober, PROBE_SETTINGS[name], value)
+            elif name == "db_flush_interval":
+                self.store.flush_interval = value
+            elif name == "last_seen_resolution":
+                self.store.last_seen_resolution = value
+            elif name == "db_synchronous":
+                self.store.set_synchronous(value)
+            elif name == "pairing_accept_timeout":
+                self.pairing_accept_timeout = value
+                self.pairing_requests.timeout = value
+            elif name == "metrics_enabled":
+                self.metrics.enabled = value
+            elif name == "stale_device_age":
+                self.collector.max_age = value
+            elif name == "stale_device_batch_size":
+                self.collector.batch_size = value
+            elif name == "stale_device_interval":
+                self.collector.interval = value
+            elif name == "max_tracked_devices":
+                self.collector.max_objects = value
+            elif name in ("discovery_rssi", "discovery_pathloss", "discovery_uuids", "discovery_duplicate_data"):
+                setattr(self, name, value)
+                if self.running:
+                    self.apply_discovery_filter()
+            elif name == "adapters":
+                self.select_adapters(value)
+            elif name == "pairing_cleanup":
+                self.cleanup.policy = value
+            elif name == "pairing_cleanup_rate":
+                self.cleanup.rate = value
+            elif name == "duty_cycle_period":
+                self.duty.period = value
+                if not value:
+                    self.duty.end()
+            elif name == "duty_cycle_min_discovery":
+                self.duty.min_discovery = value
+            elif name == "duty_cycle_max_discovery":
+                self.duty.max_discovery = value
+            elif name == "checkin_service":
+                self.checkin_service = value
+                if self.running:
+                    if value:
+                        self.start_checkin_service()
+                    else:
+                        self.stop_checkin_service()
+            elif name == "checkin_token":
+                self.checkin_token = value
+                if self.checkin_app:
+                    self.checkin_app.service.characteristic.token = value
+            else:
+                setattr(self, name, value)
+        # pairing_accept_timeout and the signal thresholds change what readings show
+        self.invalidate_snapshots()
+
+    def is_powered(self):
+        return bool(self.cache.objects.get(self.adapter_path, {}).get(ADAPTER_IFACE, {}).get("Powered"))
+
+    async def wait_for_powered(self):
+        # the cache sees Powered flip through PropertiesChanged, so just wait for it
+        if self.is_powered():
+            return
+        powered = asyncio.Event()
+        def adapter_changed(interface, changed, invalidated, path):
+            if path == self.adapter_path and interface == ADAPTER_IFACE and self.is_powered():
+                powered.set()
+        self.cache.add_properties_listener(adapter_changed)
+        try:
+            await asyncio.wait_for(powered.wait(), self.startup_timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError("Bluetooth adapter did not power on")
+        finally:
+            self.cache.properties_listeners.remove(adapter_changed)
 
     def stop(self):
         LOGGER.info("Stopping Bluetooth Manager...")
+        self.running = False
+        self.duty.end()
+        self.glib.stop()
         self.stop_advertising()
+        self.stop_checkin_service()
+        self.stop_agent()
 
         if self.discovery_active:
-            try:
-                self.adapter.StopDiscovery()
-                LOGGER.info("Discovery stopped")
-                self.discovery_active = False
-            except dbus.exceptions.DBusException as e:
-                LOGGER.error(f"Error stopping discovery: {e}")
+            self.stop_discovery()
+            LOGGER.info("Discovery stopped")
 
-        if hasattr(self, 'mainloop'):
-            self.mainloop.quit()
+        if hasattr(self, 'cache'):
+            self.cache.stop()
 
-        if hasattr(self, 'db_conn'):
-            self.db_conn.close()
+        if hasattr(self, 'store'):
+            self.store.close()
 
         LOGGER.info("Bluetooth Manager stopped")
 
+    def stop_agent(self):
+        if not self.agent:
+            return
+        try:
+            self.metrics.inc("dbus_calls", method="UnregisterAgent")
+            self.agent_manager.UnregisterAgent(self.agent.get_path())
+            LOGGER.info("Agent unregistered")
+        except dbus.exceptions.DBusException as e:
+            LOGGER.error(f"Error unregistering agent: {e}")
+        # free the object path, the next manager on this connection registers its own agent there
+        self.agent.remove_from_connection()
+        self.agent = None
+
     def load_paired_devices(self):
         LOGGER.info("Loading paired devices from database:")
-        cursor = self.db_conn.cursor()
-        cursor.execute('SELECT id, address, name, uuid FROM paired_devices')
-        for row in cursor.fetchall():
-            device_id, address, name, device_uuid = row
+        for row in self.store.load():
+            device_id, address, name, device_uuid, irk = row
             LOGGER.info(f"Loaded paired device: {name} ({address})")
-            self.paired_devices[device_id] = {
-                'address': address,
-                'name': name,
-                'uuid': device_uuid
-            }
-
-    def update_device_in_db(self, device_id, address, name, device_uuid):
-        cursor = self.db_conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO paired_devices (id, address, name, uuid, last_seen)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (device_id, address, name, device_uuid))
-        self.db_conn.commit()
+            self.registry.add_known(device_id, address, name, device_uuid, irk)
+            self.resolver.set_key(device_id, irk)
+
+    def read_device_irk(self, address, adapter_path=None):
+        adapter = self.cache.objects.get(adapter_path or self.adapter_path, {}).get(ADAPTER_IFACE, {})
+        if "Address" not in adapter:
+            return None
+        irk = read_irk(str(adapter["Address"]), address)
+        if irk:
+            LOGGER.info(f"Loaded identity resolving key for {address}")
+        else:
+            LOGGER.debug(f"No identity resolving key stored for {address}")
+        return irk
+
+    def match_known_device(self, device_id, address, device_uuid):
+        record = self.registry.match(device_id, address, device_uuid)
+        if record is None:
+            # the address may be a rotated resolvable private address of a bonded device
+            resolved_id = self.resolver.resolve(address)
+            if resolved_id is not None:
+                record = self.registry.get(resolved_id)
+        return record
+
+    def is_protected_device(self, path, props):
+        # known devices and devices in the middle of pairing are never garbage collected
+        if path in self.pairing_requests or "Address" not in props:
+            return True
+        device_id, address, name, device_uuid = device_identity(props)
+        if address in self.prober.in_flight:
+            return True
+        return self.match_known_device(device_id, address, device_uuid) is not None
+
+    @timed("update_device_in_db")
+    def update_device_in_db(self, device_id, address, name, device_uuid, irk=None):
+        # only marks the row dirty, the store writes it on its next flush
+        return self.store.upsert(device_id, address, name, device_uuid, irk)
+
+    def collect_metrics(self, metrics):
+        devices = sum(1 for _ in self.cache.devices())
+        metrics.set_gauge("bluez_objects", len(self.cache.objects))
+        metrics.set_gauge("bluez_devices", devices)
+        metrics.set_gauge("known_devices", len(self.registry))
+        metrics.set_gauge("present_devices", len(self.registry.present))
+        metrics.set_gauge("pending_expiries", len(self.expiry))
+        metrics.set_gauge("probes_in_flight", len(self.prober.in_flight))
+        for result, count in self.prober.stats.items():
+            metrics.set_gauge("probes", count, result=result)
+        finished = self.prober.stats["succeeded"] + self.prober.stats["failed"]
+        metrics.set_gauge("probe_success_ratio", round(self.prober.stats["succeeded"] / finished, 4) if finished else 0.0)
+        metrics.set_gauge("sqlite_writes", self.store.writes)
+        metrics.set_gauge("glib_iterations", self.glib.iterations)
+        for name, count in self.collector.stats.items():
+            metrics.set_gauge("device_gc", count, result=name)
+
+    def maybe_write_metrics_textfile(self):
+        if not self.metrics_textfile or not self.metrics.enabled:
+            return
+        now = time.monotonic()
+        if now - self.metrics_written >= self.metrics_textfile_interval:
+            self.metrics_written = now
+            self.metrics.write_textfile(self.metrics_textfile)
 
+    @timed("periodic_scan")
     async def periodic_scan(self):
         LOGGER.debug("Performing periodic scan...")
         try:
-            if not self.discovery_active:
-                self.adapter.StartDiscovery()
-                self.discovery_active = True
-                LOGGER.debug("Discovery started")
-            else:
-                LOGGER.debug("Discovery already active, skipping start")
+            self.schedule_radio()
             self.check_for_devices()
+            self.prune_pairing_requests()
+            self.collector.maybe_collect()
+            self.cleanup.step()
+            if self.publish_snapshots:
+                # pairing requests expire by themselves
+                self.publish()
+            self.maybe_write_metrics_textfile()
+            self.store.maybe_flush()
         except dbus.exceptions.DBusException as e:
             LOGGER.error(f"Error during periodic scan: {e}")
         return True
 
 
+    def schedule_radio(self):
+        if not self.duty.enabled or self.presence_mode == "passive":
+            # passive presence lives on advertisements, so discovery stays on
+            self.probing = True
+            # only adapters that are not discovering yet (new, or failed to start before) get a call
+            self.start_discovery()
+            return
+        known = len(self.registry.known)
+        unaccounted = sum(1 for device_id in self.registry.known if not self.registry.is_present(device_id))
+        if self.duty.advance(known, unaccounted) == DISCOVERY:
+            self.probing = False
+            self.start_discovery()
+        else:
+            # connects already in flight carry on, new ones are only started in connect windows
+            self.probing = True
+            if self.discovery_active:
+                self.stop_discovery()
+
+    def process_sightings(self):
+        pending, self.pending_sightings = self.pending_sightings, set()
+        self.duty.sighted(len(pending))
+        for path in pending:
+            self.advertisement_seen(path)
+
+    @timed("check_for_devices")
     def check_for_devices(self):
-        objects = self.om.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if DEVICE_IFACE not in interfaces:
+        self.process_sightings()
+        self.probe_candidates = []
+        checked = set()
+        now = time.time()
+        for path, properties in list(self.cache.devices()):
+            if "Address" not in properties or not self.uses_device(path):
                 continue
-            properties = interfaces[DEVICE_IFACE]
-            if not properties:
+            device_id, address, name, device_uuid = device_identity(properties)
+            # with several adapters a device has one object on each, it is checked once
+            if address in checked:
                 continue
-            address = properties["Address"]
-            name = properties.get("Name", "<unknown>")
-            uuids = properties.get("UUIDs", [])
-            device_uuid = uuids[0] if uuids else ""
-            device_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, name + address))
+            checked.add(address)
             if self.is_known_device(device_id, address, name, device_uuid):
+                if self.checked_in_recently(address, now):
+                    # the companion app keeps it present, no need to spend a connect on it
+                    continue
+                if self.presence_mode == "passive":
+                    # connect probes are only a fallback for devices advertisements have not accounted for
+                    if not self.passive_connect_fallback or self.registry.id_for_address(address) in self.registry.present:
+                        continue
                 if not self.is_device_present(address):
                     LOGGER.debug(f"Attempting to automatically connect to known device: {name} ({address})")
                     self.auto_connect_device(address)
-
-        # update present device list, removing devices not seen recently
-        updated_present_devices = {}
-        # Check for devices that are no longer present
-        for device_id, device_info in list(self.paired_devices.items()):
-            if device_id in self.present_devices:
-                if time.time() - self.present_devices[device_id]["when"] < self.device_present_linger:
-                    updated_present_devices[device_id] = self.present_devices[device_id]
-        self.present_devices = updated_present_devices
-
+        if self.probing:
+            self.duty.probed(self.prober.dispatch(self.probe_candidates))
+
+        # devices that are no longer present are expired by self.expiry at their own deadline
+        self.update_signal_model(time.time())
+
+    def update_signal_model(self, now):
+        sampled = set(self.signal.pending)
+        arrived, departed = self.signal.update(now)
+        for device_id in departed:
+            LOGGER.debug(f"Signal of device {device_id} dropped below the exit threshold")
+
+        if self.presence_mode == "passive":
+            # a device is (re)marked present when its signal comes into range and with every new
+            # sample while in range, as of when it was heard; departure is left to the linger
+            for device_id in sampled.union(arrived):
+                record = self.registry.get(device_id)
+                if not record or not self.signal.is_present(device_id):
+                    continue
+                heard = self.signal.last_seen(device_id)
+                present = self.registry.present.get(device_id)
+                if present is None or heard > present.when:
+                    self.mark_present(device_id, record.address, record.name, record.uuid, heard)
+
+        for device_id, record in self.registry.present.items():
+            stats = self.signal.stats(device_id)
+            if stats != record.signal:
+                record.signal = stats
+                self.invalidate_snapshots()
+
+    def probe_paths(self, address):
+        # the device's objects on the adapters in use, strongest recent signal first
+        paths = [path for path in self.cache.find_device_paths(address) if self.uses_device(path)]
+        paths.sort(key=lambda path: int(self.cache.get_device(path).get("RSSI", -255)), reverse=True)
+        return paths
+
+    @timed("auto_connect_device")
     def auto_connect_device(self, address):
         try:
-            device_path = self.find_device_by_address(address)
-            if device_path:
-                device = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, device_path), DBUS_PROP_IFACE)
-                props = device.GetAll(DEVICE_IFACE)
-
-                if not props.get("Connected", False):
-                    connect_method = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, device_path), DEVICE_IFACE)
-                    connect_method.Connect()
-                    LOGGER.info(f"Successfully initiated connection to device: {address}")
+            paths = self.probe_paths(address)
+            if paths:
+                if not any(self.cache.get_device(path).get("Connected", False) for path in paths):
+                    # the connect itself is issued asynchronously by the probe scheduler, on the
+                    # best adapter that has a free slot
+                    self.probe_candidates.append((address, paths))
                 else:
                     LOGGER.debug(f"Device {address} is already connected")
                     return True
@@ -727,28 +1590,21 @@ class BluetoothManager:
             LOGGER.debug(f"Error auto-connecting to device {address}: {e}")
         return False
 
+    @timed("is_device_present")
     def is_device_present(self, address):
         try:
+            # prefers the adapter connected to the device
             device_path = self.find_device_by_address(address)
-            if device_path:
-                device = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, device_path), DBUS_PROP_IFACE)
-                props = device.GetAll(DEVICE_IFACE)
-
+            props = self.cache.get_device(device_path) if device_path else None
+            if props is not None:
                 connected = props.get("Connected", False)
-                rssi = props.get("RSSI")
-                timestamp = props.get("Timestamp")
+                device_id = self.registry.id_for_address(address)
+                # a stale or noisy RSSI is not enough, the smoothed signal has to be above the enter threshold
+                in_range = device_id is not None and self.signal.is_present(device_id)
 
-                LOGGER.debug(f"Device {address} present check: Connected={connected}, RSSI={rssi}, Timestamp available: {timestamp is not None}")
-
-                # Consider the device present if it's connected or has a valid RSSI
-                is_present = connected or (rssi is not None and rssi <= 0)
-
-                if timestamp is not None:
-                    current_time = int(time.time() * 1000)  # Convert to milliseconds
-                    time_difference = current_time - int(timestamp)
-                    LOGGER.debug(f"Device {address} last seen {time_difference} ms ago")
-                    is_present = is_present and time_difference < 30000
+                LOGGER.debug(f"Device {address} present check: Connected={connected}, in range={in_range}")
 
+                is_present = bool(connected) or in_range
                 return is_present
             else:
                 LOGGER.debug(f"Device {address} not found in object manager")
@@ -758,35 +1614,24 @@ class BluetoothManager:
             return False
 
     def is_known_device(self, device_id, address, name, device_uuid):
-        if device_id in self.paired_devices:
+        if device_id in self.registry:
             LOGGER.debug(f"Device {name} ({address}) found in paired_devices by ID")
             return True
-    
+
         # update device info if it changed
-        for stored_id, stored_info in self.paired_devices.items():
-            # note that we have matching by name commented out as it would likely be too insecure
-            if (stored_info['address'] == address or 
-            #    (name != "<unknown>" and stored_info['name'] == name) or 
-                (device_uuid and stored_info['uuid'] == device_uuid)):
-                LOGGER.debug(f"Device {name} ({address}) matched with stored device {stored_info['name']} ({stored_info['address']})")
-                updated_name = name if name != "<unknown>" else f"Unknown Device ({address[-6:]})"
-                self.paired_devices[stored_id] = {
-                    'address': address,
-                    'name': updated_name,
-                    'uuid': device_uuid
-                }
-                self.update_device_in_db(stored_id, address, updated_name, device_uuid)
-                return True
-    
+        record = self.match_known_device(device_id, address, device_uuid)
+        if record:
+            LOGGER.debug(f"Device {name} ({address}) matched with stored device {record.name} ({record.address})")
+            updated_name = name if name != "<unknown>" else f"Unknown Device ({address[-6:]})"
+            if (record.address, record.name, record.uuid) != (address, updated_name, device_uuid):
+                self.registry.update_known(record, address, updated_name, device_uuid)
+                self.invalidate_snapshots()
+            self.update_device_in_db(record.id, address, updated_name, device_uuid)
+            return True
+
         LOGGER.debug(f"Device {name} ({address}) is not a known device")
         return False
 
 
     def find_device_by_address(self, address):
-        objects = self.om.GetManagedObjects()
-        for path, interfaces in objects.items():
-            if DEVICE_IFACE not in interfaces:
-                continue
-            if interfaces[DEVICE_IFACE]["Address"] == address:
-                return path
-        return None
\ No newline at end of file
+        return self.cache.find_device_by_address(address)
\ No newline at end of file
@@ -0,0 +1,171 @@
+from viam.logging import getLogger
+
+from .constants import BLUEZ_SERVICE_NAME, DBUS_OM_IFACE, DBUS_PROP_IFACE, DEVICE_IFACE, ADAPTER_IFACE
+from .metrics import Metrics
+
+LOGGER = getLogger(__name__)
+
+# Local mirror of the BlueZ object tree.
+# It is seeded with a single GetManagedObjects call, then kept current from the
+# InterfacesAdded, InterfacesRemoved and PropertiesChanged signals, so that lookups
+# by path or by address never need a D-Bus round trip.
+class BluezObjectCache:
+    def __init__(self, bus, om, metrics=None):
+        self.bus = bus
+        self.om = om
+        self.metrics = metrics or Metrics()
+        # path -> { interface -> { property -> value } }
+        self.objects = {}
+        # device address -> device paths, one per adapter that has seen the device
+        self.devices_by_address = {}
+        # bumped on every change, so callers can cheaply tell if anything happened since they last looked
+        self.generation = 0
+        self.added_listeners = []
+        self.properties_listeners = []
+        self.removed_listeners = []
+        self.signal_matches = []
+        # interfaces whose property changes are followed, others keep their seeded values
+        self.watched_interfaces = (DEVICE_IFACE, ADAPTER_IFACE)
+
+    def start(self):
+        # subscribe before seeding so no change can fall between the two
+        self.signal_matches = [
+            self.bus.add_signal_receiver(
+                self.interfaces_added,
+                dbus_interface=DBUS_OM_IFACE,
+                signal_name="InterfacesAdded",
+                bus_name=BLUEZ_SERVICE_NAME
+            ),
+            self.bus.add_signal_receiver(
+                self.interfaces_removed,
+                dbus_interface=DBUS_OM_IFACE,
+                signal_name="InterfacesRemoved",
+                bus_name=BLUEZ_SERVICE_NAME
+            ),
+        ]
+        # the arg0 match rules have the bus daemon drop PropertiesChanged for every other interface
+        # (media, GATT, battery, ...) before it reaches us
+        for interface in self.watched_interfaces:
+            self.signal_matches.append(self.bus.add_signal_receiver(
+                self.properties_changed,
+                dbus_interface=DBUS_PROP_IFACE,
+                signal_name="PropertiesChanged",
+                bus_name=BLUEZ_SERVICE_NAME,
+                arg0=interface,
+                path_keyword="path"
+            ))
+        self.seed()
+
+    def stop(self):
+        for match in self.signal_matches:
+            try:
+                match.remove()
+            except Exception as e:
+                LOGGER.debug(f"Error removing signal match: {e}")
+        self.signal_matches = []
+
+    def seed(self):
+        self.metrics.inc("dbus_calls", method="GetManagedObjects")
+        objects = self.om.GetManagedObjects()
+        self.objects = {}
+        self.devices_by_address = {}
+        for path, interfaces in objects.items():
+            self.store_interfaces(str(path), interfaces)
+        self.generation += 1
+        LOGGER.info(f"Seeded BlueZ object cache with {len(self.objects)} objects")
+
+    def add_added_listener(self, listener):
+        self.added_listeners.append(listener)
+
+    def add_properties_listener(self, listener):
+        self.properties_listeners.append(listener)
+
+    def add_removed_listener(self, listener):
+        self.removed_listeners.append(listener)
+
+    def store_interfaces(self, path, interfaces):
+        entry = self.objects.setdefault(path, {})
+        for interface, props in interfaces.items():
+            entry[str(interface)] = dict(props)
+        device = entry.get(DEVICE_IFACE)
+        if device and "Address" in device:
+            self.devices_by_address.setdefault(str(device["Address"]), set()).add(path)
+
+    def interfaces_added(self, path, interfaces):
+        self.metrics.inc("dbus_signals", signal="InterfacesAdded")
+        path = str(path)
+        self.store_interfaces(path, interfaces)
+        self.generation += 1
+        for listener in self.added_listeners:
+            listener(path, interfaces)
+
+    def interfaces_removed(self, path, interfaces):
+        self.metrics.inc("dbus_signals", signal="InterfacesRemoved")
+        path = str(path)
+        entry = self.objects.get(path)
+        if entry is None:
+            return
+        # listeners get the last known properties of what was removed
+        removed = {str(interface): entry.get(str(interface), {}) for interface in interfaces}
+        for interface in interfaces:
+            interface = str(interface)
+            if interface == DEVICE_IFACE:
+                self.unindex_device(entry.get(DEVICE_IFACE, {}).get("Address"), path)
+            entry.pop(interface, None)
+        if not entry:
+            del self.objects[path]
+        self.generation += 1
+        for listener in self.removed_listeners:
+            listener(path, removed)
+
+    def properties_changed(self, interface, changed, invalidated, path):
+        self.metrics.inc("dbus_signals", signal="PropertiesChanged")
+        path = str(path)
+        interface = str(interface)
+        props = self.objects.setdefault(path, {}).setdefault(interface, {})
+        if interface == DEVICE_IFACE and "Address" in changed:
+            self.unindex_device(props.get("Address"), path)
+            self.devices_by_address.setdefault(str(changed["Address"]), set()).add(path)
+        props.update(changed)
+        for name in invalidated:
+            props.pop(name, None)
+        self.generation += 1
+        for listener in self.properties_listeners:
+            listener(interface, changed, invalidated, path)
+
+    def unindex_device(self, address, path):
+        if address is None:
+            return
+        paths = self.devices_by_address.get(str(address))
+        if paths is not None:
+            paths.discard(path)
+            if not paths:
+                del self.devices_by_address[str(address)]
+
+    def devices(self):
+        for path, interfaces in self.objects.items():
+            props = interfaces.get(DEVICE_IFACE)
+            if props:
+                yield path, props
+
+    def adapters(self):
+        for path, interfaces in self.objects.items():
+            if ADAPTER_IFACE in interfaces:
+                yield path, interfaces[ADAPTER_IFACE]
+
+    def get_device(self, path):
+        return self.objects.get(str(path), {}).get(DEVICE_IFACE)
+
+    def find_device_paths(self, address):
+        return self.devices_by_address.get(address, ())
+
+    def find_device_by_address(self, address):
+        # with several adapters, prefer the one connected to the device, then the strongest signal
+        best = None
+        best_key = None
+        for path in self.find_device_paths(address):
+            props = self.get_device(path) or {}
+            key = (bool(props.get("Connected", False)), int(props.get("RSSI", -255)))
+            if best_key is None or key > best_key:
+                best, best_key = path, key
+        return best
@@ -0,0 +1,104 @@
+import time
+
+from viam.logging import getLogger
+
+from .constants import DEVICE_IFACE
+from .metrics import Metrics
+from .device_removal import DeviceRemover
+
+LOGGER = getLogger(__name__)
+
+# Removes stale devices from BlueZ's object tree.
+# Passive discovery in a busy place leaves bluetoothd with a Device1 object for every ambient
+# (mostly random) address it ever heard, which grows its memory and everything that walks the tree.
+# Devices that are not paired, bonded, trusted, connected or otherwise protected (known devices,
+# pending pairing requests) are removed with Adapter1.RemoveDevice once they have not been heard
+# from for max_age seconds, oldest first, and sooner while more than max_objects devices are
+# tracked.  At most batch_size removals are issued per run, asynchronously, to bound each run,
+# or as many as it takes to get back under max_objects when that is more.
+class DeviceCollector:
+    def __init__(self, bus, cache, is_protected, max_age=300, max_objects=1000, batch_size=50,
+                 interval=30, metrics=None):
+        self.cache = cache
+        self.is_protected = is_protected
+        self.max_age = max_age
+        self.max_objects = max_objects
+        self.batch_size = batch_size
+        self.interval = interval
+        self.metrics = metrics or Metrics()
+        # device path -> when BlueZ last reported anything for it
+        self.last_seen = {}
+        self.remover = DeviceRemover(bus, on_removed=self.removed, on_failed=self.remove_failed, metrics=self.metrics)
+        self.last_run = time.monotonic()
+        self.stats = {"runs": 0, "reclaimed": 0, "failed": 0}
+        now = time.monotonic()
+        for path, props in cache.devices():
+            self.last_seen[path] = now
+        cache.add_added_listener(self.interfaces_added)
+        cache.add_properties_listener(self.properties_changed)
+        cache.add_removed_listener(self.interfaces_removed)
+
+    def interfaces_added(self, path, interfaces):
+        if DEVICE_IFACE in interfaces:
+            self.last_seen[path] = time.monotonic()
+
+    def properties_changed(self, interface, changed, invalidated, path):
+        if interface == DEVICE_IFACE:
+            self.last_seen[path] = time.monotonic()
+
+    def interfaces_removed(self, path, removed):
+        if DEVICE_IFACE in removed:
+            self.last_seen.pop(path, None)
+            self.remover.forget(path)
+
+    def collectable(self, path, props):
+        if path in self.remover:
+            return False
+        if props.get("Paired") or props.get("Bonded") or props.get("Trusted") or props.get("Connected"):
+            return False
+        return not self.is_protected(path, props)
+
+    def maybe_collect(self):
+        now = time.monotonic()
+        if now - self.last_run < self.interval:
+            return 0
+        self.last_run = now
+        return self.collect(now)
+
+    def collect(self, now=None):
+        if not self.max_age and not self.max_objects:
+            return 0
+        now = time.monotonic() if now is None else now
+        self.stats["runs"] += 1
+        devices = list(self.cache.devices())
+        # removals still waiting for their reply already count against the cap
+        excess = len(devices) - len(self.remover) - self.max_objects if self.max_objects else 0
+
+        candidates = []
+        for path, props in devices:
+            if self.collectable(path, props):
+                candidates.append((self.last_seen.get(path, now), path))
+        candidates.sort()
+
+        batch = []
+        # a crowd of rotating random addresses can outgrow any fixed batch
+        limit = max(self.batch_size, excess)
+        for seen, path in candidates:
+            if len(batch) >= limit:
+                break
+            if (self.max_age and now - seen >= self.max_age) or len(batch) < excess:
+                batch.append(path)
+            else:
+                break
+        for path in batch:
+            self.remover.remove(path)
+        if batch:
+            LOGGER.debug(f"Removing {len(batch)} stale devices, {len(devices)} tracked")
+        return len(batch)
+
+    def removed(self, path):
+        self.stats["reclaimed"] += 1
+
+    def remove_failed(self, path, error):
+        self.stats["failed"] += 1
+        LOGGER.debug(f"Unable to remove stale device {path}: {error}")
@@ -0,0 +1,59 @@
+import io
+import re
+import csv
+
+from .registry import derive_device_id
+
+FIELDS = ("id", "address", "name", "uuid", "irk")
+EXPORT_FORMATS = ("json", "csv")
+
+ADDRESS_PATTERN = re.compile(r"^([0-9A-F]{2}:){5}[0-9A-F]{2}$")
+IRK_PATTERN = re.compile(r"^[0-9A-F]{32}$")
+
+# Bulk enrolment: device lists for import_devices and export_devices.
+# A list is either JSON (a list of objects) or CSV text with a header row, both with the fields
+# id, address, name, uuid and irk.  Only address is required; id defaults to the id a pairing
+# would give the device.  Rows are validated one by one as they are read, bad rows are reported
+# by their source and row number and skipped instead of failing the whole import.
+def read_devices(devices=None, csv_text=None):
+    if csv_text:
+        # row 1 is the header
+        for number, entry in enumerate(csv.DictReader(io.StringIO(csv_text)), start=2):
+            yield "csv", number, entry
+    for number, entry in enumerate(devices or (), start=1):
+        yield "devices", number, entry
+
+def parse_device(entry):
+    if not isinstance(entry, dict):
+        raise ValueError("not an object")
+    address = str(entry.get("address") or "").strip().upper()
+    if not ADDRESS_PATTERN.match(address):
+        raise ValueError(f"invalid address '{address}'")
+    name = str(entry.get("name") or "").strip() or f"Unknown Device ({address[-6:]})"
+    device_uuid = str(entry.get("uuid") or "").strip()
+    device_id = str(entry.get("id") or "").strip() or derive_device_id(name, address)
+    irk = str(entry.get("irk") or "").strip().upper() or None
+    if irk and not IRK_PATTERN.match(irk):
+        raise ValueError("irk must be 32 hex digits")
+    return device_id, address, name, device_uuid, irk
+
+def parse_devices(devices=None, csv_text=None):
+    rows = []
+    errors = []
+    for source, number, entry in read_devices(devices, csv_text):
+        try:
+            rows.append(parse_device(entry))
+        except ValueError as e:
+            errors.append({"source": source, "row": number, "error": str(e)})
+    return rows, errors
+
+def format_devices(records, export_format="json"):
+    entries = [{"id": record.id, "address": record.address, "name": record.name, "uuid": record.uuid,
+                "irk": record.irk or ""} for record in records]
+    if export_format == "json":
+        return entries
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=FIELDS, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(entries)
+    return output.getvalue()
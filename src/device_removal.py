@@ -0,0 +1,48 @@
+import dbus
+import dbus.exceptions
+
+from .constants import BLUEZ_SERVICE_NAME, ADAPTER_IFACE
+from .metrics import Metrics
+from .probe_scheduler import adapter_of
+
+# Removes device objects with asynchronous Adapter1.RemoveDevice calls on the adapter each object
+# belongs to, so a batch of removals never blocks the loop.  Paths stay in in_flight until their
+# reply (or error) comes back through the GLib bridge; on_removed(path) and on_failed(path, error)
+# are called with the outcome.
+class DeviceRemover:
+    def __init__(self, bus, on_removed=None, on_failed=None, metrics=None):
+        self.bus = bus
+        self.on_removed = on_removed
+        self.on_failed = on_failed
+        self.metrics = metrics or Metrics()
+        self.in_flight = set()
+
+    def __contains__(self, path):
+        return path in self.in_flight
+
+    def __len__(self):
+        return len(self.in_flight)
+
+    def remove(self, path):
+        self.in_flight.add(path)
+        self.metrics.inc("dbus_calls", method="RemoveDevice")
+        try:
+            adapter = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, adapter_of(path)), ADAPTER_IFACE)
+            adapter.RemoveDevice(path, reply_handler=lambda: self.removed(path),
+                                 error_handler=lambda e: self.failed(path, e))
+        except dbus.exceptions.DBusException as e:
+            self.failed(path, e)
+
+    def removed(self, path):
+        self.in_flight.discard(path)
+        if self.on_removed:
+            self.on_removed(path)
+
+    def failed(self, path, error):
+        self.in_flight.discard(path)
+        if self.on_failed:
+            self.on_failed(path, error)
+
+    def forget(self, path):
+        # the object is gone (InterfacesRemoved), whatever the reply will say
+        self.in_flight.discard(path)
@@ -0,0 +1,98 @@
+import time
+from collections import deque
+
+from viam.logging import getLogger
+
+LOGGER = getLogger(__name__)
+
+DISCOVERY = "discovery"
+CONNECT = "connect"
+
+# Alternates discovery windows with connect windows so that scanning and connect probes don't
+# fight over a single radio.  Every period starts with a discovery window followed by a connect
+# window; the discovery share of the period follows the share of known devices that are currently
+# unaccounted for, between min_discovery and max_discovery.  Devices that are away make most
+# connects fail, so the more are missing the more time goes to listening for them, while with
+# everyone present discovery pauses and the period is all connect window.
+# The last windows are kept with how many probes were started and sightings came in during each.
+class DutyCycle:
+    def __init__(self, period=0, min_discovery=0.2, max_discovery=0.8, history=20):
+        # 0 disables duty cycling, discovery then runs all the time
+        self.period = period
+        self.min_discovery = min_discovery
+        self.max_discovery = max_discovery
+        self.phase = None
+        self.window = None
+        self.window_start = 0.0
+        self.period_end = 0.0
+        self.discovery_end = 0.0
+        self.windows = deque(maxlen=history)
+        self.totals = {DISCOVERY: {"windows": 0, "seconds": 0.0, "probes": 0, "sightings": 0},
+                       CONNECT: {"windows": 0, "seconds": 0.0, "probes": 0, "sightings": 0}}
+
+    @property
+    def enabled(self):
+        return self.period > 0
+
+    def discovery_share(self, known, unaccounted):
+        if not known or not unaccounted:
+            return 0.0
+        share = unaccounted / known
+        return self.min_discovery + (self.max_discovery - self.min_discovery) * share
+
+    def advance(self, known, unaccounted, now=None):
+        # returns the phase for this tick, planning the next period when the current one is over
+        now = time.monotonic() if now is None else now
+        if now >= self.period_end:
+            self.period_end = now + self.period
+            self.discovery_end = now + self.period * self.discovery_share(known, unaccounted)
+        phase = DISCOVERY if now < self.discovery_end else CONNECT
+        if phase != self.phase:
+            self.begin(phase, now, known, unaccounted)
+        return phase
+
+    def begin(self, phase, now, known, unaccounted):
+        self.end(now)
+        self.phase = phase
+        self.window_start = now
+        self.window = {"phase": phase, "started": time.time(), "seconds": 0.0, "probes": 0, "sightings": 0,
+                       "known": known, "unaccounted": unaccounted}
+        LOGGER.debug(f"Starting {phase} window, {unaccounted} of {known} known devices unaccounted for")
+
+    def end(self, now=None):
+        if self.window is None:
+            return
+        now = time.monotonic() if now is None else now
+        window = self.window
+        window["seconds"] = round(now - self.window_start, 3)
+        totals = self.totals[window["phase"]]
+        totals["windows"] += 1
+        totals["seconds"] += window["seconds"]
+        totals["probes"] += window["probes"]
+        totals["sightings"] += window["sightings"]
+        self.windows.append(window)
+        self.window = None
+        self.phase = None
+
+    def probed(self, count):
+        if self.window is not None:
+            self.window["probes"] += count
+
+    def sighted(self, count):
+        if self.window is not None:
+            self.window["sightings"] += count
+
+    def stats(self):
+        windows = list(self.windows)
+        if self.window is not None:
+            current = dict(self.window)
+            current["seconds"] = round(time.monotonic() - self.window_start, 3)
+            current["current"] = True
+            windows.append(current)
+        return {
+            "enabled": self.enabled,
+            "period": self.period,
+            "phase": self.phase,
+            "totals": {phase: dict(totals, seconds=round(totals["seconds"], 3)) for phase, totals in self.totals.items()},
+            "windows": [dict(window, started=round(window["started"], 3)) for window in windows]
+        }
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+from viam.logging import getLogger
+
+LOGGER = getLogger(__name__)
+
+# A thread with its own asyncio loop for the Bluetooth engine.
+# The GLib bridge, the blocking D-Bus calls and the SQLite commits then run on this thread and
+# never hold up the module's loop, which only reads published snapshots and queued events and
+# hands do_command actions over with run_coroutine_threadsafe.
+class EngineThread:
+    def __init__(self, name="bluetooth-engine"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run_loop, name=name, daemon=True)
+        self.thread.start()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def submit(self, coro):
+        # returns a concurrent.futures.Future
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, fn, *args):
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    async def run(self, fn, *args):
+        # runs fn on the engine thread and waits for its result without blocking the caller's loop
+        async def invoke():
+            return fn(*args)
+        return await asyncio.wrap_future(self.submit(invoke()))
+
+    def stop(self):
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
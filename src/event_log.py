@@ -0,0 +1,76 @@
+import time
+import uuid
+import itertools
+from collections import deque
+
+EVENT_TYPES = ("arrived", "departed", "paired", "forgotten", "pairing_requested")
+# events appended but not yet picked up by a reader, enough for any sensible polling interval
+OUTBOX_SIZE = 10000
+
+# Bounded log of presence events with monotonically increasing sequence numbers, so consumers
+# can poll for what changed since the last sequence number they saw instead of the full state.
+# Sequence numbers start over with every log, so each log has an epoch that readers pass back:
+# a cursor from another epoch (the module restarted) is read as truncated instead of silently
+# waiting for the new numbers to catch up with it.
+# The writer (append) and the readers (since, resize) may run on different threads: append only
+# numbers an entry and puts it in a bounded outbox deque (append and popleft are atomic), readers
+# move what is in the outbox to the log before reading, so neither side waits for the other.
+class PresenceEventLog:
+    def __init__(self, capacity=1000):
+        self.events = deque(maxlen=capacity)
+        self.seq = 0
+        self.epoch = uuid.uuid4().hex
+        # writer side sequence number
+        self.appended = 0
+        self.outbox = deque(maxlen=OUTBOX_SIZE)
+
+    def resize(self, capacity):
+        if capacity != self.events.maxlen:
+            self.events = deque(self.events, maxlen=capacity)
+
+    def append(self, event, device_id, **info):
+        if event not in EVENT_TYPES:
+            raise ValueError(f"Unknown presence event {event}")
+        self.appended += 1
+        entry = {"seq": self.appended, "event": event, "device": device_id, "when": time.time()}
+        entry.update(info)
+        self.outbox.append(entry)
+        return entry
+
+    def drain(self):
+        while True:
+            try:
+                self.add(self.outbox.popleft())
+            except IndexError:
+                break
+
+    def add(self, entry):
+        # an entry sequenced elsewhere; since() relies on contiguous sequence numbers, so after a
+        # gap (entries dropped on the way) only what follows it is kept
+        if self.events and entry["seq"] != self.seq + 1:
+            self.events.clear()
+        self.events.append(entry)
+        self.seq = entry["seq"]
+
+    def since(self, seq, limit=None, epoch=None):
+        self.drain()
+        seq = max(0, int(seq))
+        restarted = (epoch is not None and epoch != self.epoch) or seq > self.seq
+        if restarted:
+            # the cursor belongs to an earlier log, everything since then may have been missed
+            seq = 0
+        if not self.events:
+            return {"events": [], "next": self.seq, "epoch": self.epoch, "truncated": restarted or seq < self.seq}
+        oldest = self.events[0]["seq"]
+        # sequence numbers in the buffer are contiguous, so the start index is plain arithmetic
+        start = max(0, seq + 1 - oldest)
+        stop = start + int(limit) if limit else None
+        events = list(itertools.islice(self.events, start, stop))
+        return {
+            "events": events,
+            # pass this back as "since" on the next call
+            "next": events[-1]["seq"] if events else self.seq,
+            "epoch": self.epoch,
+            # events between seq and the oldest one still buffered were dropped
+            "truncated": restarted or seq + 1 < oldest
+        }
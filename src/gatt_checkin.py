@@ -0,0 +1,143 @@
+import dbus
+import dbus.exceptions
+import dbus.service
+
+from viam.logging import getLogger
+
+from .constants import GATT_SERVICE_IFACE, GATT_CHRC_IFACE, DBUS_OM_IFACE, DBUS_PROP_IFACE
+
+LOGGER = getLogger(__name__)
+
+CHECKIN_SERVICE_UUID = "8e3c0f2a-5b7d-4c1e-9a63-1f4d2b8c7e01"
+CHECKIN_CHRC_UUID = "8e3c0f2a-5b7d-4c1e-9a63-1f4d2b8c7e02"
+
+class InvalidArgsException(dbus.exceptions.DBusException):
+    _dbus_error_name = 'org.freedesktop.DBus.Error.InvalidArgs'
+
+class NotPermittedException(dbus.exceptions.DBusException):
+    _dbus_error_name = 'org.bluez.Error.NotPermitted'
+
+# GATT application with the check-in service, registered through GattManager1.RegisterApplication.
+# A paired companion app writes a token to the check-in characteristic whenever it wants to be seen
+# (typically on every app wake-up or geofence event); the module then marks the device present
+# immediately and leaves it out of the connect probes for as long as it lingers.  Subscribers get
+# notified with the linger in seconds (uint16, little endian) after each check-in, so the app knows
+# when to check in again.  Writes need an encrypted link, i.e. a bonded device, so the bonds of
+# known devices must survive the pairing cleanup (policy none or unknown).
+class CheckInApplication(dbus.service.Object):
+    PATH = '/org/bluez/presence'
+
+    def __init__(self, bus, check_in, token=""):
+        self.path = self.PATH
+        self.services = []
+        dbus.service.Object.__init__(self, bus, self.path)
+        self.service = CheckInService(bus, self.path, 0, check_in, token)
+        self.services.append(self.service)
+
+    def get_path(self):
+        return dbus.ObjectPath(self.path)
+
+    def remove(self):
+        for service in self.services:
+            for chrc in service.characteristics:
+                chrc.remove_from_connection()
+            service.remove_from_connection()
+        self.remove_from_connection()
+
+    @dbus.service.method(DBUS_OM_IFACE, out_signature='a{oa{sa{sv}}}')
+    def GetManagedObjects(self):
+        response = {}
+        for service in self.services:
+            response[service.get_path()] = service.get_properties()
+            for chrc in service.characteristics:
+                response[chrc.get_path()] = chrc.get_properties()
+        return response
+
+class CheckInService(dbus.service.Object):
+    def __init__(self, bus, base_path, index, check_in, token):
+        self.path = f"{base_path}/service{index}"
+        self.characteristics = []
+        dbus.service.Object.__init__(self, bus, self.path)
+        self.characteristic = CheckInCharacteristic(bus, self.path, 0, check_in, token)
+        self.characteristics.append(self.characteristic)
+
+    def get_properties(self):
+        return {
+            GATT_SERVICE_IFACE: {
+                'UUID': CHECKIN_SERVICE_UUID,
+                'Primary': True,
+                'Characteristics': dbus.Array([chrc.get_path() for chrc in self.characteristics], signature='o')
+            }
+        }
+
+    def get_path(self):
+        return dbus.ObjectPath(self.path)
+
+    @dbus.service.method(DBUS_PROP_IFACE, in_signature='s', out_signature='a{sv}')
+    def GetAll(self, interface):
+        if interface != GATT_SERVICE_IFACE:
+            raise InvalidArgsException()
+        return self.get_properties()[GATT_SERVICE_IFACE]
+
+class CheckInCharacteristic(dbus.service.Object):
+    def __init__(self, bus, service_path, index, check_in, token):
+        self.path = f"{service_path}/char{index}"
+        self.service_path = service_path
+        # check_in(device_path) -> linger in seconds, or None for a device that isn't known
+        self.check_in = check_in
+        self.token = token
+        self.notifying = False
+        self.value = [dbus.Byte(0), dbus.Byte(0)]
+        dbus.service.Object.__init__(self, bus, self.path)
+
+    def get_properties(self):
+        return {
+            GATT_CHRC_IFACE: {
+                'Service': dbus.ObjectPath(self.service_path),
+                'UUID': CHECKIN_CHRC_UUID,
+                'Flags': dbus.Array(['encrypt-read', 'encrypt-write', 'notify'], signature='s'),
+                'Notifying': dbus.Boolean(self.notifying)
+            }
+        }
+
+    def get_path(self):
+        return dbus.ObjectPath(self.path)
+
+    @dbus.service.method(DBUS_PROP_IFACE, in_signature='s', out_signature='a{sv}')
+    def GetAll(self, interface):
+        if interface != GATT_CHRC_IFACE:
+            raise InvalidArgsException()
+        return self.get_properties()[GATT_CHRC_IFACE]
+
+    @dbus.service.method(GATT_CHRC_IFACE, in_signature='a{sv}', out_signature='ay')
+    def ReadValue(self, options):
+        return self.value
+
+    @dbus.service.method(GATT_CHRC_IFACE, in_signature='aya{sv}')
+    def WriteValue(self, value, options):
+        device = options.get('device')
+        if device is None:
+            raise InvalidArgsException()
+        if self.token and bytes(value).decode(errors="replace") != self.token:
+            LOGGER.debug(f"Check-in from {device} with a wrong token")
+            raise NotPermittedException("Wrong check-in token")
+        linger = self.check_in(str(device))
+        if linger is None:
+            raise NotPermittedException("Unknown device")
+        linger = max(0, min(int(linger), 0xFFFF))
+        self.value = [dbus.Byte(linger & 0xFF), dbus.Byte(linger >> 8)]
+        if self.notifying:
+            self.PropertiesChanged(GATT_CHRC_IFACE, {'Value': dbus.Array(self.value, signature='y')}, [])
+
+    # BlueZ does not pass the subscribing device, so a subscription is not a check-in by itself
+    @dbus.service.method(GATT_CHRC_IFACE)
+    def StartNotify(self):
+        self.notifying = True
+
+    @dbus.service.method(GATT_CHRC_IFACE)
+    def StopNotify(self):
+        self.notifying = False
+
+    @dbus.service.signal(DBUS_PROP_IFACE, signature='sa{sv}as')
+    def PropertiesChanged(self, interface, changed, invalidated):
+        pass
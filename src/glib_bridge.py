@@ -0,0 +1,160 @@
+import asyncio
+import select
+
+from viam.logging import getLogger
+
+try:
+    from gi.repository import GLib
+except ImportError:
+    import glib as GLib
+
+from .metrics import Metrics
+
+LOGGER = getLogger(__name__)
+
+class PollFdsUnavailable(Exception):
+    pass
+
+# Drives a GLib main context from an asyncio loop.
+# The file descriptors GLib wants polled (including the D-Bus connection) are registered with the
+# asyncio loop, so a D-Bus signal or agent call wakes us immediately instead of waiting for the
+# next tick, and an idle system just sleeps in the asyncio selector.
+class GLibAsyncioBridge:
+    def __init__(self, context=None, max_idle=1.0, fallback_interval=0.05, metrics=None):
+        self.context = context or GLib.MainContext.default()
+        self.metrics = metrics or Metrics()
+        # upper bound on how long we sleep without re-preparing the context.  libdbus can queue
+        # messages while a blocking call is in flight without the socket staying readable, so we
+        # never trust fd readiness alone for longer than this.
+        self.max_idle = max_idle
+        # used only when this PyGObject cannot report the context's poll fds
+        self.fallback_interval = fallback_interval
+        self.loop = None
+        self.wakeup = None
+        self.running = False
+        self.watched = {}
+        self.iterations = 0
+
+    def wake(self):
+        if self.loop and self.wakeup:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def stop(self):
+        self.running = False
+        self.wake()
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.running = True
+
+        if not self.context.acquire():
+            LOGGER.warning("Could not acquire GLib main context, falling back to polling")
+            await self.run_polling()
+            return
+        try:
+            await self.run_fd_driven()
+        except PollFdsUnavailable as e:
+            LOGGER.warning(f"GLib poll fds unavailable ({e}), falling back to polling every "
+                           f"{self.fallback_interval * 1000:.0f} ms")
+            self.unwatch_all()
+            await self.run_polling()
+        finally:
+            self.unwatch_all()
+            self.context.release()
+
+    async def run_fd_driven(self):
+        while self.running:
+            ready, max_priority = self.context.prepare()
+            timeout, fds = self.query(max_priority)
+            if ready:
+                timeout = 0
+            self.watch(fds)
+
+            if timeout != 0:
+                wait = self.max_idle if timeout < 0 else min(timeout / 1000.0, self.max_idle)
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            self.wakeup.clear()
+
+            self.fill_revents(fds)
+            if self.context.check(max_priority, fds):
+                with self.metrics.time("glib_dispatch"):
+                    self.context.dispatch()
+            self.iterations += 1
+            # let other asyncio tasks run between dispatches when GLib stays busy
+            await asyncio.sleep(0)
+
+    async def run_polling(self):
+        while self.running:
+            with self.metrics.time("glib_dispatch"):
+                while self.context.pending():
+                    self.context.iteration(False)
+                    self.iterations += 1
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.fallback_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    def query(self, max_priority):
+        # g_main_context_query(context, max_priority, &timeout, fds, n_fds) returns how many fds GLib
+        # needs.  PyGObject exposes it as query(max_priority) -> (needed, timeout, fds), with n_fds
+        # hidden as the length of the caller-allocated fds array; older bindings return only
+        # (timeout, fds).  When the array comes back shorter than needed, the fds are unusable.
+        try:
+            result = tuple(self.context.query(max_priority))
+            if len(result) == 2:
+                timeout, fds = result
+                fds = list(fds)
+                needed = len(fds)
+            else:
+                needed, timeout, fds = result
+                fds = list(fds)
+        except (AttributeError, TypeError, ValueError) as e:
+            raise PollFdsUnavailable(f"MainContext.query failed: {e}")
+        if needed > len(fds):
+            raise PollFdsUnavailable(f"MainContext.query returned {len(fds)} of {needed} fds")
+        return timeout, fds
+
+    def watch(self, fds):
+        wanted = {}
+        for pollfd in fds:
+            wanted[pollfd.fd] = wanted.get(pollfd.fd, 0) | int(pollfd.events)
+
+        for fd, events in list(self.watched.items()):
+            if wanted.get(fd) != events:
+                self.unwatch(fd, events)
+
+        for fd, events in wanted.items():
+            if fd in self.watched:
+                continue
+            if events & (GLib.IOCondition.IN | GLib.IOCondition.PRI | GLib.IOCondition.HUP | GLib.IOCondition.ERR):
+                self.loop.add_reader(fd, self.wakeup.set)
+            if events & GLib.IOCondition.OUT:
+                self.loop.add_writer(fd, self.wakeup.set)
+            self.watched[fd] = events
+
+    def unwatch(self, fd, events):
+        self.loop.remove_reader(fd)
+        if events & GLib.IOCondition.OUT:
+            self.loop.remove_writer(fd)
+        del self.watched[fd]
+
+    def unwatch_all(self):
+        for fd, events in list(self.watched.items()):
+            self.unwatch(fd, events)
+
+    def fill_revents(self, fds):
+        # asyncio only told us that something is ready, GLib needs to know exactly what
+        if not fds:
+            return
+        poller = select.poll()
+        for pollfd in fds:
+            pollfd.revents = 0
+            poller.register(pollfd.fd, int(pollfd.events))
+        revents = dict(poller.poll(0))
+        for pollfd in fds:
+            pollfd.revents = revents.get(pollfd.fd, 0) & (int(pollfd.events) | select.POLLHUP | select.POLLERR | select.POLLNVAL)
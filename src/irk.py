@@ -0,0 +1,96 @@
+import os
+import configparser
+from collections import OrderedDict
+
+from viam.logging import getLogger
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
+
+LOGGER = getLogger(__name__)
+
+BLUETOOTH_STORAGE = "/var/lib/bluetooth"
+
+def read_irk(adapter_address, device_address, storage=BLUETOOTH_STORAGE):
+    # BlueZ keeps the keys of a bonded device in <storage>/<adapter>/<device>/info
+    path = os.path.join(storage, adapter_address.upper(), device_address.upper(), "info")
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.optionxform = str
+    try:
+        if not parser.read(path):
+            return None
+        key = parser.get("IdentityResolvingKey", "Key", fallback=None)
+    except configparser.Error as e:
+        LOGGER.warning(f"Unable to parse {path}: {e}")
+        return None
+    if not key or len(key) != 32:
+        return None
+    return key.upper()
+
+def is_resolvable_private_address(address):
+    # the two most significant bits of a resolvable private address are 0b01
+    try:
+        return (int(address[0:2], 16) >> 6) == 0b01
+    except ValueError:
+        return False
+
+# Resolves rotating resolvable private addresses (RPAs) to known devices using their IRKs.
+# Each RPA is checked against every key with the ah() function from the Core spec (Vol 3, Part H,
+# 2.2.2): hash == e(irk, padding || prand) mod 2^24.  The AES key schedule for each IRK is set up
+# once and reused, and results (including misses) are cached per address since an RPA is stable
+# for ~15 minutes.
+class IrkResolver:
+    def __init__(self, cache_size=4096):
+        self.keys = {}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.available = Cipher is not None
+        if not self.available:
+            LOGGER.warning("cryptography is not installed, resolvable private addresses will not be resolved")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def set_key(self, device_id, irk):
+        if not irk or not self.available:
+            return
+        # BlueZ stores the key least significant octet first, AES wants it most significant first
+        key = bytes.fromhex(irk)[::-1]
+        self.keys[device_id] = Cipher(algorithms.AES(key), modes.ECB()).encryptor()
+        self.cache.clear()
+
+    def set_keys(self, keys):
+        # (device_id, irk) pairs, the cache is only cleared once
+        if not self.available:
+            return
+        for device_id, irk in keys:
+            if irk:
+                self.keys[device_id] = Cipher(algorithms.AES(bytes.fromhex(irk)[::-1]), modes.ECB()).encryptor()
+        self.cache.clear()
+
+    def remove_key(self, device_id):
+        if self.keys.pop(device_id, None) is not None:
+            self.cache.clear()
+
+    def resolve(self, address):
+        if not self.keys or not is_resolvable_private_address(address):
+            return None
+        if address in self.cache:
+            self.cache.move_to_end(address)
+            return self.cache[address]
+
+        octets = bytes.fromhex(address.replace(":", ""))
+        prand, expected = octets[0:3], octets[3:6]
+        block = bytes(13) + prand
+        device_id = None
+        for candidate, encryptor in self.keys.items():
+            if encryptor.update(block)[13:16] == expected:
+                device_id = candidate
+                break
+
+        self.cache[address] = device_id
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return device_id
@@ -0,0 +1,175 @@
+import os
+import time
+import bisect
+import inspect
+import functools
+
+from viam.logging import getLogger
+
+LOGGER = getLogger(__name__)
+
+PREFIX = "bluetooth_presence_"
+# seconds, from sub-millisecond cache lookups up to blocking D-Bus timeouts
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": buckets
+        }
+
+class Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = NullTimer()
+
+# Stage latency histograms, counters and gauges for the hot paths.
+# When disabled, time() hands back a shared no-op context manager and inc() returns immediately,
+# so instrumentation can stay in place at negligible cost.  Values that other components already
+# track (cache sizes, probe stats, ...) are pulled by collectors only when metrics are read.
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.collectors = []
+        self.started = time.time()
+
+    def time(self, stage):
+        if not self.enabled:
+            return NULL_TIMER
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        return Timer(histogram)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def add_collector(self, collector):
+        # collector(metrics) is called right before metrics are read and sets gauges
+        self.collectors.append(collector)
+
+    def collect(self):
+        for collector in self.collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                LOGGER.debug(f"Error collecting metrics: {e}")
+
+    def snapshot(self):
+        self.collect()
+        return {
+            "enabled": self.enabled,
+            "uptime": round(time.time() - self.started, 1),
+            "stages": {stage: histogram.to_dict() for stage, histogram in self.histograms.items()},
+            "counters": {format_key(key): value for key, value in self.counters.items()},
+            "gauges": {format_key(key): value for key, value in self.gauges.items()}
+        }
+
+    def render_prometheus(self):
+        self.collect()
+        lines = []
+        if self.histograms:
+            lines.append(f"# TYPE {PREFIX}stage_seconds histogram")
+        for stage, histogram in self.histograms.items():
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{PREFIX}stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{PREFIX}stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'{PREFIX}stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        for kind, values in (("counter", self.counters), ("gauge", self.gauges)):
+            typed = set()
+            for (name, labels), value in sorted(values.items()):
+                suffix = "_total" if kind == "counter" else ""
+                if name not in typed:
+                    lines.append(f"# TYPE {PREFIX}{name}{suffix} {kind}")
+                    typed.add(name)
+                lines.append(f"{PREFIX}{name}{suffix}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # node-exporter may read the file at any time, so replace it atomically
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            LOGGER.warning(f"Unable to write metrics textfile {path}: {e}")
+
+def timed(stage):
+    # times a method of an object that has a metrics attribute
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                with self.metrics.time(stage):
+                    return await method(self, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.time(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+def format_key(key):
+    name, labels = key
+    return name + format_labels(labels)
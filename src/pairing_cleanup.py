@@ -0,0 +1,91 @@
+from collections import deque
+
+from viam.logging import getLogger
+
+from .metrics import Metrics
+from .device_removal import DeviceRemover
+from .token_bucket import TokenBucket
+
+LOGGER = getLogger(__name__)
+
+CLEANUP_POLICIES = ("none", "device", "unknown", "all")
+
+# Removes BlueZ pairings after pairing requests were accepted, in the background.
+# What is removed depends on the policy: nothing, the accepted devices' own objects, the objects
+# of devices that are not known (and not about to be), or every device object as the module used
+# to do.  Paths are queued and removed with asynchronous RemoveDevice calls at no more than rate
+# per second, so an accept returns right away and a batch never stalls the loop; the queue is
+# worked off a step at a time from the periodic scan.  Whether a queued device may still be
+# removed is decided again when its turn comes.
+class PairingCleanup:
+    def __init__(self, bus, cache, is_protected, policy="device", rate=5, metrics=None):
+        self.cache = cache
+        self.is_protected = is_protected
+        self.policy = policy
+        self.metrics = metrics or Metrics()
+        self.bucket = TokenBucket(rate, tokens=1.0)
+        self.remover = DeviceRemover(bus, on_removed=self.removed, on_failed=self.remove_failed, metrics=self.metrics)
+        # (device path, whether protected devices are skipped)
+        self.queue = deque()
+        self.queued = set()
+        self.stats = {"queued": 0, "removed": 0, "skipped": 0, "failed": 0}
+
+    def schedule(self, accepted_paths):
+        # accepted_paths: the device paths of the pairing requests just accepted
+        if self.policy == "device":
+            for path in accepted_paths:
+                props = self.cache.get_device(path) or {}
+                # with several adapters the device has an object on each
+                paths = self.cache.find_device_paths(str(props["Address"])) if "Address" in props else [path]
+                for device_path in paths:
+                    self.enqueue(device_path, False)
+        elif self.policy in ("unknown", "all"):
+            for path, props in list(self.cache.devices()):
+                self.enqueue(path, self.policy == "unknown")
+        if self.queue:
+            LOGGER.debug(f"Pairing cleanup: {len(self.queue)} devices queued")
+
+    def enqueue(self, path, skip_protected):
+        path = str(path)
+        if path in self.queued or path in self.remover:
+            return
+        self.queue.append((path, skip_protected))
+        self.queued.add(path)
+        self.stats["queued"] += 1
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    @rate.setter
+    def rate(self, rate):
+        self.bucket.rate = rate
+
+    def step(self):
+        if not self.queue:
+            return 0
+        self.bucket.refill()
+        started = 0
+        while self.queue and self.bucket.available():
+            path, skip_protected = self.queue.popleft()
+            self.queued.discard(path)
+            props = self.cache.get_device(path)
+            if props is None or (skip_protected and self.is_protected(path, props)):
+                # gone already, or enrolled (or pairing) since it was queued
+                self.stats["skipped"] += 1
+                continue
+            self.bucket.take()
+            self.remover.remove(path)
+            started += 1
+        return started
+
+    def removed(self, path):
+        self.stats["removed"] += 1
+        LOGGER.info(f"Successfully removed pairing for device: {path}")
+
+    def remove_failed(self, path, error):
+        self.stats["failed"] += 1
+        LOGGER.error(f"Failed to remove pairing for device {path}: {error}")
+
+    def progress(self):
+        return dict(self.stats, policy=self.policy, pending=len(self.queue), in_flight=len(self.remover))
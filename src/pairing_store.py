@@ -0,0 +1,74 @@
+import time
+import heapq
+import datetime
+
+class PairingRequest:
+    __slots__ = ("device", "passkey", "when")
+
+    def __init__(self, device, passkey, when):
+        self.device = device
+        self.passkey = passkey
+        self.when = when
+
+    def to_dict(self):
+        return {
+            'passkey': self.passkey,
+            'device': self.device,
+            'when': datetime.datetime.fromtimestamp(self.when).isoformat()
+        }
+
+# Pending pairing requests keyed by device path.
+# A device asking again (BlueZ retries RequestConfirmation) replaces its request instead of adding
+# another.  Requests expire timeout seconds after they were made; they are dropped lazily from a
+# min-heap ordered by request time, entries left behind by a replaced or accepted request are
+# skipped when they reach the top.
+class PairingStore:
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self.requests = {}
+        self.heap = []
+
+    def __contains__(self, device):
+        request = self.requests.get(str(device))
+        return request is not None and time.time() - request.when < self.timeout
+
+    def __len__(self):
+        self.expire()
+        return len(self.requests)
+
+    def add(self, device, passkey, when=None):
+        # returns False for a repeat of a request that is already pending
+        device = str(device)
+        when = time.time() if when is None else when
+        current = self.requests.get(device)
+        repeated = current is not None and current.passkey == passkey and when - current.when < self.timeout
+        self.requests[device] = PairingRequest(device, passkey, when)
+        heapq.heappush(self.heap, (when, device))
+        return not repeated
+
+    def pop(self, device):
+        self.expire()
+        return self.requests.pop(str(device), None)
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        while self.heap and now - self.heap[0][0] >= self.timeout:
+            when, device = heapq.heappop(self.heap)
+            request = self.requests.get(device)
+            if request is not None and request.when == when:
+                del self.requests[device]
+        # drop stale entries from the top so next_expiry is exact
+        while self.heap:
+            when, device = self.heap[0]
+            request = self.requests.get(device)
+            if request is not None and request.when == when:
+                break
+            heapq.heappop(self.heap)
+
+    def current(self):
+        self.expire()
+        return [request.to_dict() for request in sorted(self.requests.values(), key=lambda request: request.when)]
+
+    def next_expiry(self):
+        self.expire()
+        return self.heap[0][0] + self.timeout if self.heap else None
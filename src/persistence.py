@@ -0,0 +1,135 @@
+import time
+import datetime
+import sqlite3
+
+from viam.logging import getLogger
+
+LOGGER = getLogger(__name__)
+
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Write-behind store for the paired_devices table.
+# Rows are written only when address, name, uuid or irk actually change, or when last_seen has moved
+# by more than last_seen_resolution seconds.  Dirty rows are coalesced and written with a single
+# executemany every flush_interval seconds and at shutdown, with the database in WAL mode.
+class DeviceStore:
+    def __init__(self, path, synchronous="NORMAL", flush_interval=30, last_seen_resolution=60):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(f'PRAGMA synchronous={synchronous}')
+        self.flush_interval = flush_interval
+        self.last_seen_resolution = last_seen_resolution
+        # id -> (address, name, uuid, irk) as last persisted
+        self.rows = {}
+        # id -> last_seen epoch as last persisted
+        self.last_seen = {}
+        # id -> (address, name, uuid, irk, last_seen epoch) waiting to be written
+        self.dirty = {}
+        self.last_flush = time.monotonic()
+        self.writes = 0
+        self.create_table()
+
+    def set_synchronous(self, synchronous):
+        self.conn.execute(f'PRAGMA synchronous={synchronous}')
+
+    def create_table(self):
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS paired_devices (
+                id TEXT PRIMARY KEY,
+                address TEXT,
+                name TEXT,
+                uuid TEXT,
+                last_seen TIMESTAMP,
+                irk TEXT
+            )
+        ''')
+        # databases created before irk was stored
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(paired_devices)')]
+        if 'irk' not in columns:
+            self.conn.execute('ALTER TABLE paired_devices ADD COLUMN irk TEXT')
+        self.conn.commit()
+
+    def load(self):
+        cursor = self.conn.execute('SELECT id, address, name, uuid, irk FROM paired_devices')
+        rows = cursor.fetchall()
+        now = time.time()
+        for device_id, address, name, device_uuid, irk in rows:
+            self.rows[device_id] = (address, name, device_uuid, irk)
+            self.last_seen[device_id] = now
+        return rows
+
+    def upsert(self, device_id, address, name, device_uuid, irk=None, seen=None):
+        seen = seen or time.time()
+        if irk is None:
+            irk = self.rows.get(device_id, (None, None, None, None))[3]
+        values = (address, name, device_uuid, irk)
+        if self.rows.get(device_id) == values and seen - self.last_seen.get(device_id, 0) < self.last_seen_resolution:
+            return False
+        self.rows[device_id] = values
+        self.last_seen[device_id] = seen
+        self.dirty[device_id] = values + (seen,)
+        return True
+
+    def delete(self, device_id):
+        self.rows.pop(device_id, None)
+        self.last_seen.pop(device_id, None)
+        self.dirty.pop(device_id, None)
+        self.conn.execute('DELETE FROM paired_devices WHERE id = ?', (device_id,))
+        self.conn.commit()
+        self.writes += 1
+
+    def maybe_flush(self):
+        if self.dirty and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.dirty:
+            return 0
+        batch = [
+            (device_id, address, name, device_uuid, irk, format_timestamp(seen))
+            for device_id, (address, name, device_uuid, irk, seen) in self.dirty.items()
+        ]
+        try:
+            with self.conn:
+                self.conn.executemany('''
+                    INSERT OR REPLACE INTO paired_devices (id, address, name, uuid, irk, last_seen)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', batch)
+        except sqlite3.Error as e:
+            # keep the rows dirty so the next flush retries them
+            LOGGER.error(f"Error flushing paired devices to database: {e}")
+            return 0
+        self.dirty = {}
+        self.writes += 1
+        LOGGER.debug(f"Flushed {len(batch)} paired device rows to database")
+        return len(batch)
+
+    def import_rows(self, rows):
+        # rows of (device_id, address, name, uuid, irk), written in a single transaction together
+        # with any pending write-behind rows; raises sqlite3.Error with nothing applied
+        seen = time.time()
+        imported = {device_id: (address, name, device_uuid, irk) for device_id, address, name, device_uuid, irk in rows}
+        pending = {device_id: values for device_id, values in self.dirty.items() if device_id not in imported}
+        batch = [(device_id,) + values + (format_timestamp(seen),) for device_id, values in imported.items()]
+        batch.extend((device_id, address, name, device_uuid, irk, format_timestamp(last_seen))
+                     for device_id, (address, name, device_uuid, irk, last_seen) in pending.items())
+        with self.conn:
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO paired_devices (id, address, name, uuid, irk, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', batch)
+        self.rows.update(imported)
+        self.last_seen.update((device_id, seen) for device_id in imported)
+        self.dirty = {}
+        self.last_flush = time.monotonic()
+        self.writes += 1
+        return len(imported)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+def format_timestamp(seen):
+    # same format (UTC) that sqlite's CURRENT_TIMESTAMP produced for existing rows
+    return datetime.datetime.fromtimestamp(seen, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
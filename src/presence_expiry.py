@@ -0,0 +1,80 @@
+import time
+import heapq
+
+from viam.logging import getLogger
+
+LOGGER = getLogger(__name__)
+
+# Expires present devices at their exact deadline (last seen + linger) instead of scanning all of
+# them every tick.  Deadlines live in a min-heap with at most one live entry per device: pushing a
+# later deadline is deferred until the earlier entry pops, so a device sighted every second does
+# not grow the heap.  A single asyncio timer is armed for the earliest deadline.
+class PresenceExpiry:
+    def __init__(self, on_expired):
+        self.on_expired = on_expired
+        self.heap = []
+        self.deadlines = {}
+        self.loop = None
+        self.timer = None
+        self.timer_deadline = None
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def start(self, loop):
+        self.loop = loop
+        self.arm()
+
+    def stop(self):
+        if self.timer:
+            self.timer.cancel()
+        self.timer = None
+        self.timer_deadline = None
+        self.loop = None
+
+    def schedule(self, device_id, deadline):
+        current = self.deadlines.get(device_id)
+        self.deadlines[device_id] = deadline
+        if current is None or deadline < current:
+            heapq.heappush(self.heap, (deadline, device_id))
+            self.arm()
+
+    def shorten(self, device_id, deadline):
+        current = self.deadlines.get(device_id)
+        if current is not None and deadline < current:
+            self.schedule(device_id, deadline)
+
+    def cancel(self, device_id):
+        # the heap entry is dropped lazily when it pops
+        self.deadlines.pop(device_id, None)
+
+    def arm(self):
+        if self.loop is None or not self.heap:
+            return
+        earliest = self.heap[0][0]
+        if self.timer and self.timer_deadline <= earliest:
+            return
+        if self.timer:
+            self.timer.cancel()
+        self.timer_deadline = earliest
+        self.timer = self.loop.call_later(max(0.0, earliest - time.time()), self.fire)
+
+    def fire(self):
+        self.timer = None
+        self.timer_deadline = None
+        now = time.time()
+        while self.heap and self.heap[0][0] <= now:
+            deadline, device_id = heapq.heappop(self.heap)
+            current = self.deadlines.get(device_id)
+            if current is None:
+                continue
+            if current > deadline:
+                # seen again since this entry was pushed, requeue at its real deadline
+                heapq.heappush(self.heap, (current, device_id))
+                continue
+            del self.deadlines[device_id]
+            try:
+                self.on_expired(device_id)
+            except Exception as e:
+                LOGGER.error(f"Error expiring present device {device_id}: {e}")
+        self.arm()
@@ -0,0 +1,132 @@
+import asyncio
+
+from viam.logging import getLogger
+
+from .presence_expiry import PresenceExpiry
+from .event_log import PresenceEventLog
+from .snapshot import SnapshotPublisher, ReadingsSnapshot
+
+LOGGER = getLogger(__name__)
+
+EMPTY_SNAPSHOT = ReadingsSnapshot(0, {"present_devices": {}, "known_devices": {}, "pairing_requests": []})
+
+# One sensor component's view of a shared BluetoothManager.
+# The manager does the scanning, probing, pairing and persistence once and reports
+# sightings to every view; a view only keeps which of its devices are present, for how long
+# (its own linger) and its own event log and readings snapshot.  devices optionally restricts
+# the view to a group of device ids or addresses, all known devices are included otherwise.
+#
+# Everything but reconfigure and the readers below (changes, readings, resize_events) runs where the
+# manager runs.
+# When that is the engine thread, events reach the readers through the event log's outbox, and
+# readers only take the snapshot the engine last published, so neither side waits for the other.
+class PresenceView:
+    def __init__(self, name, device_present_linger=30, devices=None, event_log_size=1000):
+        self.name = name
+        self.device_present_linger = device_present_linger
+        self.devices = set()
+        self.set_devices(devices)
+        self.manager = None
+        # device id -> time last seen, a subset of the manager's present devices
+        self.present = {}
+        self.expiry = PresenceExpiry(self.expired)
+        self.events = PresenceEventLog(event_log_size)
+        self.snapshot = SnapshotPublisher(self.build_snapshot)
+        # set when the manager runs on its own thread
+        self.threaded = False
+
+    def set_devices(self, devices):
+        self.devices = {device.upper() if ":" in device else device for device in devices or ()}
+
+    def reconfigure(self, device_present_linger, devices):
+        # runs on the caller's side, before the engine is configured, so that the engine's linger
+        # (the longest of its views') already sees the new value; apply_devices follows on the engine
+        self.device_present_linger = device_present_linger
+        self.set_devices(devices)
+
+    def apply_devices(self):
+        # devices that left the group stop being reported
+        for device_id in [device_id for device_id in self.present if not self.includes_id(device_id)]:
+            self.expired(device_id)
+        self.snapshot.invalidate()
+
+    def attach(self, manager):
+        self.manager = manager
+        self.expiry.start(asyncio.get_event_loop())
+        self.snapshot.invalidate()
+
+    def detach(self):
+        self.expiry.stop()
+        self.manager = None
+
+    def includes(self, device_id, address=None):
+        if not self.devices:
+            return True
+        return device_id in self.devices or (address is not None and address.upper() in self.devices)
+
+    def includes_id(self, device_id):
+        record = self.manager.registry.get(device_id) if self.manager else None
+        return self.includes(device_id, record.address if record else None)
+
+    def sighted(self, device_id, address, name, when):
+        if not self.includes(device_id, address):
+            return
+        arrived = device_id not in self.present
+        self.present[device_id] = when
+        self.expiry.schedule(device_id, when + self.device_present_linger)
+        self.snapshot.invalidate()
+        if arrived:
+            self.append_event("arrived", device_id, address=address, name=name)
+
+    def departing(self, device_id, deadline):
+        self.expiry.shorten(device_id, deadline)
+
+    def expired(self, device_id):
+        if self.present.pop(device_id, None) is None:
+            return
+        self.expiry.cancel(device_id)
+        self.snapshot.invalidate()
+        record = self.manager.registry.get(device_id) if self.manager else None
+        self.append_event("departed", device_id, address=record.address if record else None,
+                          name=record.name if record else None)
+
+    def forgotten(self, device_id, address, name):
+        if not self.includes(device_id, address):
+            return
+        self.present.pop(device_id, None)
+        self.expiry.cancel(device_id)
+        self.append_event("forgotten", device_id, address=address, name=name)
+        self.snapshot.invalidate()
+
+    def record(self, event, device_id, **info):
+        # pairing events concern the adapter, every view reports them
+        self.append_event(event, device_id, **info)
+        self.snapshot.invalidate()
+
+    def append_event(self, event, device_id, **info):
+        self.events.append(event, device_id, **info)
+
+    def changes(self, since, limit=None, epoch=None):
+        return self.events.since(since, limit, epoch)
+
+    def resize_events(self, capacity):
+        self.events.resize(capacity)
+
+    def readings(self):
+        if not self.threaded:
+            return self.snapshot.get()
+        # the engine thread publishes a new snapshot whenever something changed
+        return self.snapshot.current or EMPTY_SNAPSHOT
+
+    def build_snapshot(self):
+        if self.manager is None:
+            # still waiting for BlueZ
+            return {"present_devices": {}, "known_devices": {}, "pairing_requests": []}, None
+        shared, expires = self.manager.shared_readings()
+        readings = dict(shared)
+        readings["present_devices"] = {device_id: info for device_id, info in shared["present_devices"].items()
+                                       if device_id in self.present}
+        if self.devices:
+            readings["known_devices"] = {device_id: info for device_id, info in readings["known_devices"].items()
+                                         if self.includes(device_id, info.get("address"))}
+        return readings, expires
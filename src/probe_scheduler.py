@@ -0,0 +1,143 @@
+import time
+import random
+
+import dbus
+import dbus.exceptions
+
+from viam.logging import getLogger
+
+from .constants import BLUEZ_SERVICE_NAME, DEVICE_IFACE
+from .metrics import Metrics
+from .token_bucket import TokenBucket
+
+LOGGER = getLogger(__name__)
+
+class ProbeState:
+    __slots__ = ("address", "path", "last_seen", "failures", "next_attempt")
+
+    def __init__(self, address):
+        self.address = address
+        self.path = None
+        self.last_seen = 0.0
+        self.failures = 0
+        self.next_attempt = 0.0
+
+# Schedules connect probes to known devices without blocking the event loop.
+# Connect() is issued asynchronously (the reply arrives through the GLib bridge), with a cap on
+# connects in flight, a global probes-per-second token bucket, and a per-device exponential
+# backoff that resets whenever the device is sighted.  When more devices are due than the budget
+# allows, the most recently sighted ones go first since they are the most likely to be in range.
+# The in-flight cap and the rate apply per adapter, and each probe goes out on the first adapter
+# in the candidate's preference order (best signal first) that has a free slot.
+class ProbeScheduler:
+    def __init__(self, bus, max_in_flight=4, probes_per_second=2.0, backoff_base=2.0, backoff_max=300.0, connect_timeout=10.0, metrics=None):
+        self.bus = bus
+        self.metrics = metrics or Metrics()
+        self.max_in_flight = max_in_flight
+        self.probes_per_second = probes_per_second
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connect_timeout = connect_timeout
+        self.states = {}
+        self.in_flight = {}
+        self.bucket = TokenBucket(probes_per_second)
+        self.adapter_count = 1
+        self.stats = {"started": 0, "succeeded": 0, "failed": 0}
+
+    def state(self, address):
+        state = self.states.get(address)
+        if state is None:
+            state = self.states[address] = ProbeState(address)
+        return state
+
+    def sighted(self, address):
+        state = self.state(address)
+        state.last_seen = time.monotonic()
+        state.failures = 0
+        state.next_attempt = 0.0
+
+    def forget(self, address):
+        self.states.pop(address, None)
+
+    def refill(self, now):
+        self.bucket.rate = self.probes_per_second * self.adapter_count
+        self.bucket.refill(now)
+
+    def adapter_load(self):
+        load = {}
+        for address in self.in_flight:
+            adapter = adapter_of(self.state(address).path)
+            load[adapter] = load.get(adapter, 0) + 1
+        return load
+
+    def dispatch(self, candidates):
+        # candidates: iterable of (address, device_paths) for known devices that are not present,
+        # device_paths being the device's objects on each adapter in order of preference
+        now = time.monotonic()
+        self.refill(now)
+        # a reply that never came back (e.g. bluetoothd restarted) must not hold a slot forever
+        for address, started in list(self.in_flight.items()):
+            if now - started > self.connect_timeout * 2:
+                self.probe_failed(address, "no reply")
+
+        due = []
+        for address, paths in candidates:
+            if address in self.in_flight:
+                continue
+            state = self.state(address)
+            if state.next_attempt <= now:
+                due.append((state, paths))
+        due.sort(key=lambda entry: (-entry[0].last_seen, entry[0].address))
+
+        load = self.adapter_load()
+        started = 0
+        for state, paths in due:
+            if not self.bucket.available():
+                break
+            path = next((path for path in paths if load.get(adapter_of(path), 0) < self.max_in_flight), None)
+            if path is None:
+                # every adapter that can reach this device is busy
+                continue
+            adapter = adapter_of(path)
+            load[adapter] = load.get(adapter, 0) + 1
+            state.path = path
+            self.bucket.take()
+            self.start_probe(state, now)
+            started += 1
+        return started
+
+    def start_probe(self, state, now):
+        address = state.address
+        self.in_flight[address] = now
+        self.stats["started"] += 1
+        self.metrics.inc("dbus_calls", method="Connect")
+        try:
+            device = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE_NAME, state.path), DEVICE_IFACE)
+            device.Connect(reply_handler=lambda: self.probe_succeeded(address),
+                           error_handler=lambda e: self.probe_failed(address, e),
+                           timeout=self.connect_timeout)
+            LOGGER.debug(f"Initiated connection probe to device: {address}")
+        except dbus.exceptions.DBusException as e:
+            self.probe_failed(address, e)
+
+    def probe_succeeded(self, address):
+        self.in_flight.pop(address, None)
+        self.stats["succeeded"] += 1
+        state = self.state(address)
+        state.failures = 0
+        state.next_attempt = 0.0
+        LOGGER.info(f"Successfully connected to device: {address}")
+
+    def probe_failed(self, address, error):
+        self.in_flight.pop(address, None)
+        self.stats["failed"] += 1
+        state = self.state(address)
+        state.failures += 1
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (state.failures - 1)))
+        # a little jitter keeps devices that failed together from retrying together
+        state.next_attempt = time.monotonic() + delay * random.uniform(0.9, 1.1)
+        LOGGER.debug(f"Connection probe to {address} failed ({error}), retrying in {delay:.0f}s")
+
+def adapter_of(device_path):
+    # BlueZ device objects live under their adapter, /org/bluez/hci0/dev_...
+    return device_path.rsplit("/", 1)[0] if device_path else None
@@ -0,0 +1,60 @@
+import asyncio
+
+from viam.logging import getLogger
+
+from .constants import BLUEZ_SERVICE_NAME, DBUS_OM_IFACE, ADAPTER_IFACE
+from .glib_bridge import GLibAsyncioBridge
+
+LOGGER = getLogger(__name__)
+
+DBUS_SERVICE_NAME = "org.freedesktop.DBus"
+DBUS_IFACE = "org.freedesktop.DBus"
+
+# Waits until BlueZ can actually be used: org.bluez owns its bus name and has registered an adapter.
+# Both are detected from signals (NameOwnerChanged, InterfacesAdded) rather than by sleeping, so a
+# start takes as long as bluetoothd needs and no longer.  Raises TimeoutError after timeout seconds.
+async def wait_for_bluez(bus, timeout=30.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    ready = asyncio.Event()
+
+    # signals are only delivered while the GLib context is dispatched, and the manager's bridge
+    # doesn't exist yet
+    glib = GLibAsyncioBridge()
+    glib_task = asyncio.ensure_future(glib.run())
+    matches = []
+    try:
+        matches.append(bus.add_signal_receiver(
+            lambda name, old, new: ready.set() if new else None,
+            dbus_interface=DBUS_IFACE,
+            signal_name="NameOwnerChanged",
+            bus_name=DBUS_SERVICE_NAME,
+            arg0=BLUEZ_SERVICE_NAME
+        ))
+        if not bus.name_has_owner(BLUEZ_SERVICE_NAME):
+            LOGGER.info("Waiting for BlueZ to start...")
+            await wait_until(ready, deadline, "BlueZ did not acquire its bus name")
+
+        ready.clear()
+        matches.append(bus.add_signal_receiver(
+            lambda path, interfaces: ready.set() if ADAPTER_IFACE in interfaces else None,
+            dbus_interface=DBUS_OM_IFACE,
+            signal_name="InterfacesAdded",
+            bus_name=BLUEZ_SERVICE_NAME
+        ))
+        om = bus.get_object(BLUEZ_SERVICE_NAME, "/")
+        objects = om.GetManagedObjects(dbus_interface=DBUS_OM_IFACE)
+        if not any(ADAPTER_IFACE in interfaces for interfaces in objects.values()):
+            LOGGER.info("Waiting for a Bluetooth adapter...")
+            await wait_until(ready, deadline, "No Bluetooth adapter found")
+    finally:
+        for match in matches:
+            match.remove()
+        glib.stop()
+        await glib_task
+
+async def wait_until(event, deadline, message):
+    try:
+        await asyncio.wait_for(event.wait(), max(0, deadline - asyncio.get_running_loop().time()))
+    except asyncio.TimeoutError:
+        raise TimeoutError(message)
@@ -0,0 +1,153 @@
+import uuid
+import functools
+
+# Device ids are derived from name + address for every BlueZ device on every tick, memoize them.
+@functools.lru_cache(maxsize=8192)
+def derive_device_id(name, address):
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, name + address))
+
+def device_identity(props):
+    # (device id, address, name, first service uuid) of a BlueZ device with an Address
+    address = str(props["Address"])
+    name = props.get("Name", "<unknown>")
+    uuids = props.get("UUIDs", [])
+    return derive_device_id(name, address), address, name, uuids[0] if uuids else ""
+
+class KnownDevice:
+    __slots__ = ("id", "address", "name", "uuid", "irk")
+
+    def __init__(self, device_id, address, name, device_uuid, irk=None):
+        self.id = device_id
+        self.address = address
+        self.name = name
+        self.uuid = device_uuid
+        self.irk = irk
+
+    def to_dict(self):
+        return {
+            'address': self.address,
+            'name': self.name,
+            'uuid': self.uuid
+        }
+
+class PresentDevice:
+    __slots__ = ("id", "address", "name", "uuid", "when", "signal")
+
+    def __init__(self, device_id, address, name, device_uuid, when):
+        self.id = device_id
+        self.address = address
+        self.name = name
+        self.uuid = device_uuid
+        self.when = when
+        # smoothed rssi, estimated distance and confidence, when there is a signal model for the device
+        self.signal = None
+
+    def to_dict(self):
+        info = {
+            'address': self.address,
+            'name': self.name,
+            'uuid': self.uuid,
+            'when': self.when
+        }
+        if self.signal:
+            info.update(self.signal)
+        return info
+
+# Known (paired) and present devices, with secondary indexes so matching a BlueZ device
+# against the enrolled ones costs the same regardless of how many are enrolled.
+class DeviceRegistry:
+    def __init__(self):
+        self.known = {}
+        self.present = {}
+        self.by_address = {}
+        self.by_uuid = {}
+
+    def __len__(self):
+        return len(self.known)
+
+    def __contains__(self, device_id):
+        return device_id in self.known
+
+    def get(self, device_id):
+        return self.known.get(device_id)
+
+    def add_known(self, device_id, address, name, device_uuid, irk=None):
+        existing = self.known.get(device_id)
+        if existing:
+            self.unindex(existing)
+        record = KnownDevice(device_id, address, name, device_uuid, irk)
+        self.known[device_id] = record
+        self.index(record)
+        return record
+
+    def add_known_many(self, rows):
+        # rows of (device_id, address, name, device_uuid, irk), e.g. an import
+        records = [KnownDevice(*row) for row in rows]
+        for record in records:
+            existing = self.known.get(record.id)
+            if existing:
+                self.unindex(existing)
+        self.known.update((record.id, record) for record in records)
+        for record in records:
+            self.index(record)
+        return records
+
+    def update_known(self, record, address, name, device_uuid):
+        self.unindex(record)
+        record.address = address
+        record.name = name
+        record.uuid = device_uuid
+        self.index(record)
+
+    def remove_known(self, device_id):
+        record = self.known.pop(device_id, None)
+        if record:
+            self.unindex(record)
+        self.present.pop(device_id, None)
+        return record
+
+    def index(self, record):
+        if record.address:
+            self.by_address[record.address] = record.id
+        if record.uuid:
+            self.by_uuid[record.uuid] = record.id
+
+    def unindex(self, record):
+        if self.by_address.get(record.address) == record.id:
+            del self.by_address[record.address]
+        if self.by_uuid.get(record.uuid) == record.id:
+            del self.by_uuid[record.uuid]
+
+    def match(self, device_id, address, device_uuid):
+        # by id first, then address, then service uuid
+        # note that we do not match by name as it would likely be too insecure
+        record = self.known.get(device_id)
+        if record:
+            return record
+        matched_id = self.by_address.get(address)
+        if matched_id is None and device_uuid:
+            matched_id = self.by_uuid.get(device_uuid)
+        return self.known.get(matched_id) if matched_id is not None else None
+
+    def id_for_address(self, address):
+        return self.by_address.get(address)
+
+    def mark_present(self, device_id, address, name, device_uuid, when):
+        record = self.present.get(device_id)
+        if record:
+            record.address = address
+            record.name = name
+            record.uuid = device_uuid
+            record.when = when
+        else:
+            record = self.present[device_id] = PresentDevice(device_id, address, name, device_uuid, when)
+        return record
+
+    def is_present(self, device_id):
+        return device_id in self.present
+
+    def known_devices(self):
+        return {device_id: record.to_dict() for device_id, record in self.known.items()}
+
+    def present_devices(self):
+        return {device_id: record.to_dict() for device_id, record in self.present.items()}
@@ -0,0 +1,135 @@
+import math
+
+import numpy as np
+
+# Per-device RSSI model for every tracked device, kept in preallocated NumPy arrays with one row
+# per device.  Samples are only queued as they arrive; once per tick a single vectorized pass
+# applies EWMA smoothing, a log-distance path-loss estimate and enter/exit hysteresis for all
+# devices, so the per-tick cost stays flat as the number of devices grows.
+class SignalModel:
+    def __init__(self, capacity=64, alpha=0.3, enter_rssi=-80, exit_rssi=-88, tx_power=-59,
+                 path_loss_exponent=2.0, sample_timeout=30):
+        self.alpha = alpha
+        self.enter_rssi = enter_rssi
+        self.exit_rssi = exit_rssi
+        self.tx_power = tx_power
+        self.path_loss_exponent = path_loss_exponent
+        self.sample_timeout = sample_timeout
+        self.rows = {}
+        self.ids = []
+        # device_id -> (rssi, when), only the latest sample since the last tick is kept
+        self.pending = {}
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.smoothed = np.full(capacity, np.nan)
+        self.variance = np.zeros(capacity)
+        self.last_sample = np.zeros(capacity)
+        self.present = np.zeros(capacity, dtype=bool)
+        self.distance = np.full(capacity, np.nan)
+        self.confidence = np.zeros(capacity)
+
+    def grow(self):
+        old = (self.smoothed, self.variance, self.last_sample, self.present, self.distance, self.confidence)
+        self.allocate(self.capacity * 2)
+        for new, previous in zip((self.smoothed, self.variance, self.last_sample, self.present, self.distance, self.confidence), old):
+            new[:len(previous)] = previous
+
+    def row(self, device_id):
+        row = self.rows.get(device_id)
+        if row is None:
+            if len(self.ids) == self.capacity:
+                self.grow()
+            row = len(self.ids)
+            self.rows[device_id] = row
+            self.ids.append(device_id)
+            self.reset(row)
+        return row
+
+    def reset(self, row):
+        self.smoothed[row] = np.nan
+        self.variance[row] = 0.0
+        self.last_sample[row] = 0.0
+        self.present[row] = False
+        self.distance[row] = np.nan
+        self.confidence[row] = 0.0
+
+    def remove(self, device_id):
+        self.pending.pop(device_id, None)
+        row = self.rows.pop(device_id, None)
+        if row is None:
+            return
+        # keep rows dense by moving the last row into the freed slot
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            for array in (self.smoothed, self.variance, self.last_sample, self.present, self.distance, self.confidence):
+                array[row] = array[last]
+            self.ids[row] = moved_id
+            self.rows[moved_id] = row
+        self.ids.pop()
+        self.reset(last)
+
+    def add_sample(self, device_id, rssi, when):
+        self.row(device_id)
+        # several adapters can hear the same device within one tick, the strongest of them counts
+        pending = self.pending.get(device_id)
+        if pending is None or rssi >= pending[0]:
+            self.pending[device_id] = (float(rssi), when)
+
+    def update(self, now):
+        # returns (ids that entered, ids that exited) since the last update
+        if self.pending:
+            idx = np.fromiter((self.rows[device_id] for device_id in self.pending), dtype=np.intp, count=len(self.pending))
+            values = np.fromiter((sample[0] for sample in self.pending.values()), dtype=float, count=len(self.pending))
+            when = np.fromiter((sample[1] for sample in self.pending.values()), dtype=float, count=len(self.pending))
+            self.pending = {}
+
+            previous = self.smoothed[idx]
+            first = np.isnan(previous)
+            smoothed = np.where(first, values, self.alpha * values + (1 - self.alpha) * previous)
+            deviation = np.where(first, 0.0, values - previous)
+            self.variance[idx] = (1 - self.alpha) * (self.variance[idx] + self.alpha * deviation * deviation)
+            self.smoothed[idx] = smoothed
+            self.last_sample[idx] = when
+
+        n = len(self.ids)
+        if n == 0:
+            return [], []
+        smoothed = self.smoothed[:n]
+        age = now - self.last_sample[:n]
+        fresh = age < self.sample_timeout
+
+        was_present = self.present[:n].copy()
+        entered = fresh & (smoothed >= self.enter_rssi)
+        exited = ~fresh | (smoothed < self.exit_rssi)
+        present = (was_present | entered) & ~exited
+        self.present[:n] = present
+
+        self.distance[:n] = np.power(10.0, (self.tx_power - smoothed) / (10.0 * self.path_loss_exponent))
+        stability = 1.0 / (1.0 + np.sqrt(self.variance[:n]) / 10.0)
+        self.confidence[:n] = np.where(fresh, np.clip(1.0 - age / self.sample_timeout, 0.0, 1.0) * stability, 0.0)
+
+        arrived = [self.ids[row] for row in np.flatnonzero(present & ~was_present)]
+        departed = [self.ids[row] for row in np.flatnonzero(was_present & ~present)]
+        return arrived, departed
+
+    def is_present(self, device_id):
+        row = self.rows.get(device_id)
+        return row is not None and bool(self.present[row])
+
+    def last_seen(self, device_id):
+        # when the device's latest sample was taken
+        row = self.rows.get(device_id)
+        return float(self.last_sample[row]) if row is not None else None
+
+    def stats(self, device_id):
+        row = self.rows.get(device_id)
+        if row is None or math.isnan(self.smoothed[row]):
+            return None
+        return {
+            'rssi': round(float(self.smoothed[row]), 1),
+            'distance': round(float(self.distance[row]), 2),
+            'confidence': round(float(self.confidence[row]), 2)
+        }
@@ -0,0 +1,66 @@
+import time
+
+DEVICE_FIELDS = ("present_devices", "known_devices")
+
+class ReadingsSnapshot:
+    __slots__ = ("version", "readings", "ids", "expires")
+
+    def __init__(self, version, readings, expires=None):
+        self.version = version
+        self.readings = dict(readings, version=version)
+        # device ids per device field, precomputed for ids_only requests
+        self.ids = {field: sorted(readings[field]) for field in DEVICE_FIELDS if field in readings}
+        # time at which something in the snapshot (a pairing request) goes stale by itself
+        self.expires = expires
+
+    def filtered(self, extra):
+        # fields: only these top level keys
+        # ids_only: device dictionaries are replaced by a list of their ids
+        # seen_since: only present devices seen at or after this timestamp
+        fields = extra.get("fields") or list(self.readings)
+        if isinstance(fields, str):
+            # a single key, iterating it would go character by character
+            fields = [fields]
+        seen_since = extra.get("seen_since")
+        if seen_since is not None:
+            try:
+                seen_since = float(seen_since)
+            except (TypeError, ValueError):
+                raise ValueError(f"seen_since must be a unix timestamp, got {seen_since!r}")
+        ids_only = bool(extra.get("ids_only"))
+
+        ret = {"version": self.version}
+        for field in fields:
+            if field not in self.readings or field == "version":
+                continue
+            value = self.readings[field]
+            if field == "present_devices" and seen_since is not None:
+                value = {device_id: info for device_id, info in value.items() if info["when"] >= seen_since}
+                if ids_only:
+                    value = sorted(value)
+            elif ids_only and field in self.ids:
+                value = self.ids[field]
+            ret[field] = value
+        return ret
+
+# Publishes an immutable readings snapshot that is rebuilt only after the state it was built from
+# changed, so get_readings costs the same no matter how often it is called.
+# A published snapshot is never mutated, a change produces a new one with a higher version.
+class SnapshotPublisher:
+    def __init__(self, build):
+        self.build = build
+        self.version = 0
+        self.dirty = True
+        self.current = None
+
+    def invalidate(self):
+        self.dirty = True
+
+    def get(self):
+        current = self.current
+        if current is None or self.dirty or (current.expires is not None and time.time() >= current.expires):
+            self.dirty = False
+            self.version += 1
+            readings, expires = self.build()
+            current = self.current = ReadingsSnapshot(self.version, readings, expires)
+        return current
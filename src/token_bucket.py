@@ -0,0 +1,20 @@
+import time
+
+# Token bucket for rate limits: rate tokens per second, holding at most max(1, rate) tokens so
+# that an idle period does not turn into a burst.  rate can be changed at any time.
+class TokenBucket:
+    def __init__(self, rate, tokens=None):
+        self.rate = rate
+        self.tokens = float(max(1.0, rate)) if tokens is None else tokens
+        self.last_refill = time.monotonic()
+
+    def refill(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def available(self):
+        return self.tokens >= 1.0
+
+    def take(self):
+        self.tokens -= 1.0